@@ -1,13 +1,35 @@
 import re
+import shutil
 import os
+import asyncio
+import tempfile
 import csv
-import io
+import codecs
+import json
+import functools
+import contextvars
+import logging
+import threading
+import time
 
 from datetime import datetime
-from typing import Set, Tuple, Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Set, Tuple, Dict, Any, BinaryIO, Callable, Iterable, Iterator, List, Optional
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from supabase import create_client, Client
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from psycopg2.extensions import connection as Connection
+from psycopg2.extras import Json
+
+from app.cache import analytics_cache
+from app.db import get_conn
+from app.jobs import ImportJob, import_jobs
+from app.server_timing import timed_phase
+from app.supabase_client import get_supabase
+from app.commands.refresh_analytics_snapshots import refresh_analytics_snapshots_in_background
+from app.services.snapshot import SNAPSHOTS_ENABLED
+from app.services.semester import invalidate_semester_catalogue
 
 
 def _safe_error_message(err: Exception) -> str:
@@ -20,6 +42,39 @@ def _safe_error_message(err: Exception) -> str:
     return text or err.__class__.__name__
 
 router = APIRouter(prefix="/api/import", tags = ["import"])
+logger = logging.getLogger(__name__)
+
+# Bounded pool for the blocking import pipeline; imports beyond IMPORT_MAX_WORKERS wait
+# for a free worker instead of taking threads from the request handlers
+IMPORT_MAX_WORKERS = int(os.getenv("IMPORT_MAX_WORKERS", "2"))
+import_executor = ThreadPoolExecutor(max_workers=IMPORT_MAX_WORKERS, thread_name_prefix="attendance-import")
+
+# Snapshot refreshes run on their own worker so they never hold an import slot; a
+# refresh requested while another is still queued folds into the queued one
+snapshot_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-refresh")
+_snapshot_refresh_lock = threading.Lock()
+_snapshot_refresh_queued = False
+
+def schedule_snapshot_refresh() -> None:
+    """Queues a background refresh of the analytics snapshots unless one is already queued"""
+    global _snapshot_refresh_queued
+    with _snapshot_refresh_lock:
+        if _snapshot_refresh_queued:
+            return
+        _snapshot_refresh_queued = True
+    snapshot_refresh_executor.submit(_run_snapshot_refresh)
+
+def _run_snapshot_refresh() -> None:
+    global _snapshot_refresh_queued
+    with _snapshot_refresh_lock:
+        _snapshot_refresh_queued = False
+    refresh_analytics_snapshots_in_background()
+
+def shutdown_import_executor() -> None:
+    """Lets running imports finish and drops queued ones; called on app shutdown"""
+    import_executor.shutdown(wait=True, cancel_futures=True)
+    # After the imports, which may still queue a refresh
+    snapshot_refresh_executor.shutdown(wait=True, cancel_futures=True)
 
 # -----------------------------
 # CSV header aliases (contains-match)
@@ -54,17 +109,6 @@ CHECKIN_HEADER_ALIASES = [
     "timestamp",
 ]
 
-# -----------------------------
-# Supabase client
-# -----------------------------
-def get_supabase() -> Client:
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-    if not url or not key:
-        raise RuntimeError("Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY in apps/server/.env")
-
-    return create_client(url, key)
-
 # -----------------------------
 # Helpers: normalization + parsing
 # -----------------------------'''
@@ -76,7 +120,7 @@ def normalize_text(s: str) -> str:
     return s
 
 def normalize_email(email: str) -> str:
-    """Normalize emails (remove ALL whitespace, lowercase)"""
+    """Normalize emails (remove ALL whitespace, lowercase), like the email_normalized columns (migrations/0004)"""
     return re.sub(r"\s+", "", (email or "").strip().lower())
 
 def find_header(headers: List[str], aliases: List[str]) -> Optional[str]:
@@ -114,22 +158,122 @@ def normalize_class_year_to_program(class_year_raw: str) -> str:
         return "Unknown"
     return "Unknown"
 
+# -----------------------------
+# Major normalization
+# -----------------------------
+# Patterns are compiled once at import; the same few hundred major strings repeat
+# across every upload, so results are memoized per raw string.
+MAJOR_NORMALIZATION_CACHE_SIZE = 4096
+
+GRAD_DEGREE_RE = re.compile(
+    r"(m\.?\s?s\.?)|\bms\b|\bma\b|\bmba\b|\bmph\b|\bmfa\b|\bmm\b|\bmlis\b|\bmpa\b|\bmsw\b|\bmat\b|\bmup\b|\bmbt\b|\bmara\b|master|graduate|\bphd\b|doctor"
+)
+UNDERGRAD_DEGREE_RE = re.compile(
+    r"(b\.?\s?s\.?)|\bbs\b|(b\.?\s?a\.?)|\bba\b|\bbfa\b|\bbm\b|bachelor|undergrad"
+)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_BRACKETS_RE = re.compile(r"[()•]")
+_PUNCTUATION_RE = re.compile(r"[.,:;\'\"`]")
+_MULTI_MAJOR_SPLIT_RE = re.compile(r"\s*(\+|\/|,| and )\s*", flags=re.IGNORECASE)
+_CONCENTRATION_RE = re.compile(r"\bconcentration\b.*$")
+_DEGREE_TOKEN_RE = re.compile(
+    r"\b(b\.?\s?s\.?|b\.?\s?a\.?|m\.?\s?s\.?|mba|phd|bachelors?|masters?|undergrad(uate)?|graduate|bs|ba|ms|ma|mfa|mph|mm|mlis|mpa|msw|mat|mup|mbt|mara|bfa|bm)\b"
+)
+_UNKNOWN_MAJOR_RE = re.compile(r"^(n\/a|na|none|blank|undeclared|undecided|unknown)$", flags=re.I)
+
+# Bases that map to a major only on an exact match
+MAJOR_EXACT_ALIASES = {
+    "econ": ("Economics", "Business"),
+    "psych": ("Psychology", "Health Sciences"),
+    "bio": ("Biology", "Health Sciences"),
+}
+
+# (substring keys, major, category) in precedence order: the first entry with any key
+# contained in the base wins. A major of None keeps the title-cased base (keyword fallback).
+MAJOR_ALIASES: List[Tuple[List[str], Optional[str], str]] = [
+    (["economics"], "Economics", "Business"),
+    (["psychology"], "Psychology", "Health Sciences"),
+    (["biology", "biological sciences"], "Biology", "Health Sciences"),
+
+    # Technical
+    (["computer science", "comp sci", "cs", "bscs", "bs cs", "ms cs"], "Computer Science", "Technical"),
+    (["software engineering", "software eng", "swe", "se"], "Software Engineering", "Technical"),
+    (["data science", "data sci", "ds"], "Data Science", "Technical"),
+    (["artificial intelligence", "ai"], "Artificial Intelligence", "Technical"),
+    (["computer engineering"], "Computer Engineering", "Technical"),
+    (["informatics"], "Informatics", "Technical"),
+    (["information science and data analytics", "information science", "data analytics"], "Information Science and Data Analytics", "Technical"),
+
+    # Business
+    (["business administration", "business", "MBA"], "Business", "Business"),
+    (["communication studies", "communications", "public relations"], "Business", "Business"),
+    (["marketing"], "Business", "Business"),
+    (["finance", "economics"], "Business", "Business"),
+    (["accounting", "accountancy"], "Business", "Business"),
+    (["management information systems", "mis", "business analytics"], "Business", "Business"),
+    (["business analytics"], "Business", "Business"),
+
+    # Humanities & Arts
+    (["ux", "ui ux", "ui/ux", "interaction design"], "Design", "Humanities & Arts"),
+    (["graphic design", "animation", "illustration", "interior design", "industrial design", "studio art", "art history", "photography"], "Arts / Design", "Humanities & Arts"),
+    (["english", "history", "philosophy", "linguistics", "humanities", "religious studies"], "Humanities", "Humanities & Arts"),
+    (["journalism", "radio television film"], "Humanities & Arts", "Humanities & Arts"),
+    (["sociology", "justice studies", "criminology", "anthropology", "political science", "global studies", "chicana", "african american", "american studies", "interdisciplinary studies"], "Humanities & Arts", "Humanities & Arts"),
+
+    # Health Sciences
+    (["nursing"], "Nursing", "Health Sciences"),
+    (["public health"], "Public Health", "Health Sciences"),
+    (["kinesiology"], "Kinesiology", "Health Sciences"),
+    (["occupational therapy"], "Occupational Therapy", "Health Sciences"),
+    (["speech language pathology"], "Speech Language Pathology", "Health Sciences"),
+    (["nutritional science", "nutrition"], "Nutritional Science", "Health Sciences"),
+    (["clinical mental health counseling", "counseling"], "Counseling", "Health Sciences"),
+
+    # Keyword fallback
+    ([
+        "engineering", "computer", "data", "statistics", "mathematics", "math",
+        "physics", "chemistry", "geology", "meteorology", "climate",
+        "earth system", "forensic science",
+    ], None, "Technical"),
+    ([
+        "business", "account", "finance", "marketing", "management", "taxation",
+        "public administration", "transportation management",
+    ], None, "Business"),
+    (["health", "nursing", "therapy", "nutrition", "kinesiology"], None, "Health Sciences"),
+    ([
+        "art", "design", "music", "dance", "theatre", "english", "history",
+        "philosophy", "journalism", "film", "humanities", "language",
+    ], None, "Humanities & Arts"),
+]
+
+def _compile_alias_matcher(aliases: List[Tuple[List[str], Optional[str], str]]) -> Tuple["re.Pattern[str]", Dict[str, int]]:
+    """
+    Compiles every alias key into one alternation inside a lookahead, ordered by
+    precedence, plus a key -> entry index map. At each position the alternation
+    reports the highest-precedence key starting there, so the minimum entry index
+    over all positions is the entry the ordered substring scan would have picked.
+    """
+    precedence: Dict[str, int] = {}
+    for index, (keys, _major, _category) in enumerate(aliases):
+        for key in keys:
+            precedence.setdefault(key, index)
+    ordered_keys = sorted(precedence, key=precedence.__getitem__)
+    pattern = re.compile("(?=(" + "|".join(re.escape(k) for k in ordered_keys) + "))")
+    return pattern, precedence
+
+MAJOR_ALIAS_RE, MAJOR_ALIAS_PRECEDENCE = _compile_alias_matcher(MAJOR_ALIASES)
+
 def infer_degree_program_from_major_raw(major_raw: str) -> Optional[str]:
     """Infer Graduate/Undergraduate from tokens in the major string (e.g., 'M.S. CS')"""
     s = normalize_text(major_raw)
 
     # Search for grad tokens
-    if re.search(
-        r"(m\.?\s?s\.?)|\bms\b|\bma\b|\bmba\b|\bmph\b|\bmfa\b|\bmm\b|\bmlis\b|\bmpa\b|\bmsw\b|\bmat\b|\bmup\b|\bmbt\b|\bmara\b|master|graduate|\bphd\b|doctor",
-        s
-    ):
+    if GRAD_DEGREE_RE.search(s):
         return "Graduate"
 
     # Search for undergrad tokens
-    if re.search(
-        r"(b\.?\s?s\.?)|\bbs\b|(b\.?\s?a\.?)|\bba\b|\bbfa\b|\bbm\b|bachelor|undergrad",
-        s
-    ):
+    if UNDERGRAD_DEGREE_RE.search(s):
         return "Undergraduate"
     
     # If can't infer
@@ -143,29 +287,26 @@ def major_base_for_matching(major_raw: str) -> str:
         return ""
 
     s = s.replace("&", " and ")
-    s = re.sub(r"[()•]", " ", s)
-    s = re.sub(r"[.,:;\'\"`]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _BRACKETS_RE.sub(" ", s)
+    s = _PUNCTUATION_RE.sub(" ", s)
+    s = _WHITESPACE_RE.sub(" ", s).strip()
 
     # If multiple majors provided, choose only first
-    parts = re.split(r"\s*(\+|\/|,| and )\s*", s, flags=re.IGNORECASE)
+    parts = _MULTI_MAJOR_SPLIT_RE.split(s)
 
     if parts:
         s = parts[0].strip()
     
     # Edge case - remove "concentration..." and everything after
-    s = re.sub(r"\bconcentration\b.*$", " ", s).strip()
+    s = _CONCENTRATION_RE.sub(" ", s).strip()
 
     # Remove degree tokens
-    s = re.sub(
-        r"\b(b\.?\s?s\.?|b\.?\s?a\.?|m\.?\s?s\.?|mba|phd|bachelors?|masters?|undergrad(uate)?|graduate|bs|ba|ms|ma|mfa|mph|mm|mlis|mpa|msw|mat|mup|mbt|mara|bfa|bm)\b",
-        " ",
-        s
-    ).strip()
+    s = _DEGREE_TOKEN_RE.sub(" ", s).strip()
 
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _WHITESPACE_RE.sub(" ", s).strip()
     return s
 
+@functools.lru_cache(maxsize=MAJOR_NORMALIZATION_CACHE_SIZE)
 def normalize_major_and_category(major_raw: str) -> Tuple[str, str]:
     """
     Returns (major_normalized, major_category)
@@ -173,84 +314,22 @@ def normalize_major_and_category(major_raw: str) -> Tuple[str, str]:
     """
     base = major_base_for_matching(major_raw)
 
-    if not base or re.match(r"^(n\/a|na|none|blank|undeclared|undecided|unknown)$", base, flags=re.I):
+    if not base or _UNKNOWN_MAJOR_RE.match(base):
         return ("Unknown", "Other/Unknown")
 
-    if "economics" in base or base == "econ":
-        return ("Economics", "Business")
-    if "psychology" in base or base == "psych":
-        return ("Psychology", "Health Sciences")
-    if "biology" in base or base == "bio" or "biological sciences" in base:
-        return ("Biology", "Health Sciences")
-    
-    ALIASES = [
-        # Technical
-        (["computer science", "comp sci", "cs", "bscs", "bs cs", "ms cs"], "Computer Science", "Technical"),
-        (["software engineering", "software eng", "swe", "se"], "Software Engineering", "Technical"),
-        (["data science", "data sci", "ds"], "Data Science", "Technical"),
-        (["artificial intelligence", "ai"], "Artificial Intelligence", "Technical"),
-        (["computer engineering"], "Computer Engineering", "Technical"),
-        (["informatics"], "Informatics", "Technical"),
-        (["information science and data analytics", "information science", "data analytics"], "Information Science and Data Analytics", "Technical"),
-
-        # Business
-        (["business administration", "business", "MBA"], "Business", "Business"),
-        (["communication studies", "communications", "public relations"], "Business", "Business"),
-        (["marketing"], "Business", "Business"),
-        (["finance", "economics"], "Business", "Business"),
-        (["accounting", "accountancy"], "Business", "Business"),
-        (["management information systems", "mis", "business analytics"], "Business", "Business"),
-        (["business analytics"], "Business", "Business"),
-
-        # Humanities & Arts
-        (["ux", "ui ux", "ui/ux", "interaction design"], "Design", "Humanities & Arts"),
-        (["graphic design", "animation", "illustration", "interior design", "industrial design", "studio art", "art history", "photography"], "Arts / Design", "Humanities & Arts"),
-        (["english", "history", "philosophy", "linguistics", "humanities", "religious studies"], "Humanities", "Humanities & Arts"),
-        (["journalism", "radio television film"], "Humanities & Arts", "Humanities & Arts"),
-        (["sociology", "justice studies", "criminology", "anthropology", "political science", "global studies", "chicana", "african american", "american studies", "interdisciplinary studies"], "Humanities & Arts", "Humanities & Arts"),
-
-        # Health Sciences
-        (["nursing"], "Nursing", "Health Sciences"),
-        (["public health"], "Public Health", "Health Sciences"),
-        (["kinesiology"], "Kinesiology", "Health Sciences"),
-        (["occupational therapy"], "Occupational Therapy", "Health Sciences"),
-        (["speech language pathology"], "Speech Language Pathology", "Health Sciences"),
-        (["nutritional science", "nutrition"], "Nutritional Science", "Health Sciences"),
-        (["clinical mental health counseling", "counseling"], "Counseling", "Health Sciences"),
-    ]
-
-    # Try alias matching first (exact match or substring match)
-    for keys, major, cat in ALIASES:
-        for k in keys:
-            if base == k or k in base:
-                return (major, cat)
-    
-    # Keyword fallback
-    if any(w in base for w in [
-        "engineering", "computer", "data", "statistics", "mathematics", "math",
-        "physics", "chemistry", "geology", "meteorology", "climate",
-        "earth system", "forensic science"
-    ]):
-        return (title_case(base), "Technical")
-
-    if any(w in base for w in [
-        "business", "account", "finance", "marketing", "management", "taxation",
-        "public administration", "transportation management"
-    ]):
-        return (title_case(base), "Business")
+    if base in MAJOR_EXACT_ALIASES:
+        return MAJOR_EXACT_ALIASES[base]
 
-    if any(w in base for w in [
-        "health", "nursing", "therapy", "nutrition", "kinesiology"
-    ]):
-        return (title_case(base), "Health Sciences")
+    # One pass over the base finds the highest-precedence alias contained in it
+    best = min(
+        (MAJOR_ALIAS_PRECEDENCE[m.group(1)] for m in MAJOR_ALIAS_RE.finditer(base)),
+        default=None,
+    )
+    if best is None:
+        return ("Unknown", "Other/Unknown")
 
-    if any(w in base for w in [
-        "art", "design", "music", "dance", "theatre", "english", "history",
-        "philosophy", "journalism", "film", "humanities", "language"
-    ]):
-        return (title_case(base), "Humanities & Arts")
-    
-    return ("Unknown", "Other/Unknown")
+    _keys, major, category = MAJOR_ALIASES[best]
+    return (major if major is not None else title_case(base), category)
 
 def parse_datetime_local(dt_str: str) -> str:
     """
@@ -280,11 +359,314 @@ def parse_check_in_at(s: str) -> Optional[str]:
     except ValueError:
         raise HTTPException(status_code=400, detail="Timestamp in csv upload is not consistent with expected format %m/%d/%Y %H:%M:%S")
 
+def normalize_attendance_row(
+    row: Dict[str, Any],
+    attendee_email: str,
+    member: Optional[Dict[str, Any]],
+    *,
+    major_col: Optional[str],
+    program_col: Optional[str],
+    checkin_col: Optional[str],
+    recognized_cols: Set[str],
+) -> Tuple[Dict[str, Any], Set[str]]:
+    """
+    Builds the attendance row for one CSV row and the attendee's member record, if any.
+    Also returns the warnings raised: "bad_checkin", "missing_program" and "missing_major".
+    """
+    warnings: Set[str] = set()
+
+    major_raw_csv = (row.get(major_col) or "").strip() if major_col else ""
+    # NOTE: way we find program is actually need to do more logic -> based on response "Freshman", "Sophomore", "Junior"... "Grad" -> separates into undergrad and grad
+    class_year_raw = (row.get(program_col) or "").strip() if program_col else ""
+    # NOTE: always will have check in col
+    checkin_raw = (row.get(checkin_col) or "").strip() if checkin_col else ""
+
+    # Check-in timestamp but do not fail the entire upload if one row is bad
+    check_in_iso = None
+    check_in_parse_error = None
+    if checkin_raw:
+        try:
+            check_in_iso = parse_check_in_at(checkin_raw)
+        except HTTPException as e:
+            warnings.add("bad_checkin")
+            check_in_parse_error = str(e.detail)
+
+    # Determine program (Undergrad/Grad/Unknown) from class standing, inferred major tokens, or member row
+    used_program_source = "unknown"
+    attendee_program = "Unknown"
+    if class_year_raw:
+        used_program_source = "class_year"
+        attendee_program = normalize_class_year_to_program(class_year_raw)
+        if attendee_program == "Unknown":
+            warnings.add("missing_program")
+    else:
+        inferred = infer_degree_program_from_major_raw(major_raw_csv or "")
+        if inferred:
+            used_program_source = "inferred_from_major"
+            attendee_program = inferred
+        elif member and (member.get("degree_program") or "").strip():
+            used_program_source = "members"
+            attendee_program = (member.get("degree_program") or "").strip()
+        else:
+            warnings.add("missing_program")
+
+    # Determine major/category from CSV first, then member row, else Unknown
+    used_major_source = "unknown"
+    attendee_major_raw = None
+    attendee_major_normalized = "Unknown"
+    attendee_major_category = "Other/Unknown"
+
+    if major_raw_csv:
+        used_major_source = "csv"
+        attendee_major_raw = major_raw_csv
+        attendee_major_normalized, attendee_major_category = normalize_major_and_category(major_raw_csv)
+    elif member:
+        used_major_source = "members"
+        attendee_major_raw = member.get("major_raw")
+        attendee_major_normalized = member.get("major_normalized") or "Unknown"
+        attendee_major_category = member.get("major_category") or "Other/Unknown"
+    else:
+        warnings.add("missing_major")
+
+    # Separate known columns vs extras for metadata debugging
+    extra_cols = {k: v for k, v in row.items() if k not in recognized_cols}
+
+    attendance_row = {
+        "attendee_email": attendee_email,
+        # Link attendance to members table using canonical stored email so FK always matches.
+        "member_email": member.get("email") if member else None,
+        "attendee_major_raw": attendee_major_raw,
+        "attendee_major_normalized": attendee_major_normalized,
+        "attendee_major_category": attendee_major_category,
+        "attendee_program": attendee_program,
+        "check_in_at": check_in_iso,
+        "metadata": {
+            "raw_row": row,  # includes everything
+            "extra_columns": extra_cols,  # explicitly highlights extras
+            "used_major_source": used_major_source,
+            "used_program_source": used_program_source,
+            "check_in_raw": checkin_raw or None,
+            "check_in_parse_error": check_in_parse_error,  # None if ok
+        },
+    }
+    return attendance_row, warnings
+
+# -----------------------------
+# Bulk ingest: rows spooled in COPY format, then events row + COPY into staging + merge, in one transaction
+# -----------------------------
+# Staged per row; event_id is added on merge, since rows are spooled before the event exists
+ATTENDANCE_COPY_COLUMNS = [
+    "attendee_email",
+    "member_email",
+    "attendee_major_raw",
+    "attendee_major_normalized",
+    "attendee_major_category",
+    "attendee_program",
+    "check_in_at",
+    "metadata",
+]
+
+def _copy_text_field(value: Optional[str]) -> str:
+    """Encodes one field for COPY's text format (NULL is \\N; escape backslash, tab, newlines)"""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+UPLOAD_READ_CHUNK_BYTES = 64 * 1024
+IMPORT_BATCH_ROWS = 1000
+SKIPPED_ROWS_REPORT_LIMIT = 100
+
+def copy_upload(upload: BinaryIO) -> BinaryIO:
+    """Copies an upload into a temp file the caller owns; blocking, so run it off the event loop"""
+    spooled = tempfile.TemporaryFile()
+    try:
+        upload.seek(0)
+        shutil.copyfileobj(upload, spooled, UPLOAD_READ_CHUNK_BYTES)
+    except Exception:
+        spooled.close()
+        raise
+    return spooled
+
+def iter_upload_lines(upload: BinaryIO) -> Iterator[str]:
+    """
+    Decodes the uploaded file as UTF-8 in fixed-size chunks and yields it line by line,
+    so csv.DictReader never needs the whole upload in memory. Lines split on "\\n"
+    only, like iterating the fully decoded text did; the csv module handles "\\r".
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    upload.seek(0)
+    pending = ""
+    while True:
+        chunk = upload.read(UPLOAD_READ_CHUNK_BYTES)
+        pending += decoder.decode(chunk, final=not chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+        if not chunk:
+            break
+    if pending:
+        yield pending
+
+def iter_row_batches(reader: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Groups parsed CSV rows into lists of at most size rows"""
+    batch: List[Dict[str, Any]] = []
+    for row in reader:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+MEMBER_LOOKUP_BATCH_SIZE = 1000
+
+def fetch_members_by_email(conn: Connection, emails: Set[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetches the members matching the given normalized emails, in batches of
+    MEMBER_LOOKUP_BATCH_SIZE, keyed by normalized email. Matching on the stored
+    email_normalized column uses its index from migrations/0004.
+    """
+    members_by_email: Dict[str, Dict[str, Any]] = {}
+    ordered = sorted(emails)
+    with conn.cursor() as cur:
+        for start in range(0, len(ordered), MEMBER_LOOKUP_BATCH_SIZE):
+            batch = ordered[start:start + MEMBER_LOOKUP_BATCH_SIZE]
+            cur.execute(
+                """
+                SELECT email, major_raw, major_normalized, major_category, degree_program
+                FROM public.members
+                WHERE email_normalized = ANY(%(emails)s);
+                """,
+                {"emails": batch},
+            )
+            for m in cur.fetchall():
+                key = normalize_email(m["email"])
+                if key in emails:
+                    members_by_email[key] = dict(m)
+    return members_by_email
+
+def insert_event(conn: Connection, event_payload: Dict[str, Any]) -> str:
+    """Inserts the events row inside the caller's transaction and returns its generated id"""
+    columns = list(event_payload.keys())
+    values = [
+        Json(event_payload[c]) if isinstance(event_payload[c], dict) else event_payload[c]
+        for c in columns
+    ]
+    with conn.cursor() as cur:
+        cur.execute(
+            f"INSERT INTO public.events ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) RETURNING id;",
+            values,
+        )
+        return str(cur.fetchone()["id"])
+
+def create_attendance_staging(conn: Connection) -> None:
+    """Creates the temp table attendance batches are copied into; it is dropped on commit"""
+    column_list = ", ".join(ATTENDANCE_COPY_COLUMNS)
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            CREATE TEMP TABLE event_attendance_staging ON COMMIT DROP AS
+            SELECT {column_list} FROM public.event_attendance WITH NO DATA;
+            """
+        )
+
+def write_attendance_copy_row(spool: IO[str], attendance_row: Dict[str, Any]) -> None:
+    """Appends one attendance row to spool in COPY's text format"""
+    fields = [
+        attendance_row["attendee_email"],
+        attendance_row["member_email"],
+        attendance_row["attendee_major_raw"],
+        attendance_row["attendee_major_normalized"],
+        attendance_row["attendee_major_category"],
+        attendance_row["attendee_program"],
+        attendance_row["check_in_at"],
+        json.dumps(attendance_row["metadata"]),
+    ]
+    spool.write("\t".join(_copy_text_field(f) for f in fields))
+    spool.write("\n")
+
+def copy_attendance_spool(conn: Connection, spool: IO[str]) -> None:
+    """Streams the spooled attendance rows into the staging table with COPY"""
+    spool.seek(0)
+    with conn.cursor() as cur:
+        cur.copy_expert(
+            f"COPY event_attendance_staging ({', '.join(ATTENDANCE_COPY_COLUMNS)}) FROM STDIN",
+            spool,
+        )
+
+def merge_attendance_staging(conn: Connection, event_id: str) -> int:
+    """
+    Merges the staged rows into public.event_attendance for event_id with ON CONFLICT
+    (event_id, attendee_email), matching the previous PostgREST upsert. Runs inside
+    the caller's transaction.
+    """
+    column_list = ", ".join(ATTENDANCE_COPY_COLUMNS)
+    update_list = ", ".join(
+        f"{c} = EXCLUDED.{c}" for c in ATTENDANCE_COPY_COLUMNS if c != "attendee_email"
+    )
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO public.event_attendance (event_id, {column_list})
+            SELECT %(event_id)s::uuid, {column_list} FROM event_attendance_staging
+            ON CONFLICT (event_id, attendee_email) DO UPDATE
+            SET {update_list};
+            """,
+            {"event_id": event_id},
+        )
+        return cur.rowcount
+
+def refresh_event_stats(conn: Connection, event_id: str) -> None:
+    """
+    Recomputes the event's public.event_stats row (migrations/0005) from its merged
+    attendance. Runs inside the caller's transaction.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT public.refresh_event_stats(ARRAY[%s]::uuid[]);", (event_id,))
+
+JSON_STREAM_CHUNK_BYTES = 64 * 1024
+
+def iter_json(payload: Any) -> Iterator[bytes]:
+    """Encodes payload incrementally, yielding UTF-8 chunks of about JSON_STREAM_CHUNK_BYTES"""
+    pending: List[str] = []
+    pending_size = 0
+    for piece in json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).iterencode(payload):
+        pending.append(piece)
+        pending_size += len(piece)
+        if pending_size >= JSON_STREAM_CHUNK_BYTES:
+            yield "".join(pending).encode("utf-8")
+            pending = []
+            pending_size = 0
+    if pending:
+        yield "".join(pending).encode("utf-8")
+
+def invalidate_analytics_cache(starts_at_iso: str) -> None:
+    """
+    Drops cached analytics that an import into an event starting at starts_at_iso can change.
+    Retention/mission entries only go stale for windows containing the event; overview
+    (active-member recompute), the combined dashboard, semester options and the
+    per-semester summary always do.
+    """
+    invalidate_semester_catalogue()
+    try:
+        event_date = datetime.fromisoformat(starts_at_iso).date()
+    except ValueError:
+        analytics_cache.invalidate()
+        return
+    analytics_cache.invalidate(on_date=event_date, endpoints={"overview", "dashboard", "semesters", "by_semester"})
+
 # -----------------------------
 # Endpoint: import event attendance
 # -----------------------------
 @router.post("/event-attendance")
 async def import_event_attendance(
+    response: Response,
     import_type: str = Form(...), # expect "event_attendance"
     title: str = Form(...),
     starts_at: str = Form(...),
@@ -292,11 +674,10 @@ async def import_event_attendance(
     event_type: str = Form(""),  # Workshop / Panel / etc.
     location: str = Form(""),
     committee: str = Form(""),
+    background: bool = Form(False),  # queue the import and return a job id right away
 
     file: UploadFile = File(...),
 ):
-    supabase = get_supabase()
-
     # Validate import type
     if normalize_text(import_type) != "event_attendance":
         raise HTTPException(status_code=400, detail="import_type must be 'event_attendance' for this endpoint")
@@ -319,10 +700,101 @@ async def import_event_attendance(
     if not filename.lower().endswith(".csv"):
         raise HTTPException(status_code=400, detail="File must be a .csv")
 
-    # Read CSV
-    raw_bytes = await file.read()
-    csv_text = raw_bytes.decode("utf-8", errors="replace")
-    reader = csv.DictReader(io.StringIO(csv_text))
+    import_kwargs = {
+        "title": title,
+        "starts_at_iso": starts_at_iso,
+        "event_kind": ek,
+        "event_type": et,
+        "location": (location or "").strip() or None,
+        "committee": (committee or "").strip() or None,
+        "filename": filename,
+    }
+
+    if background:
+        # The request's upload is closed once the response is sent, so the job gets its own
+        # copy. The copy is disk I/O, so it runs on the threadpool instead of the event loop
+        spooled = await run_in_threadpool(copy_upload, file.file)
+
+        job = import_jobs.create()
+        import_executor.submit(run_import_job, job, spooled, import_kwargs)
+        response.status_code = 202
+        return {
+            "status": "queued",
+            "job_id": job.id,
+            "statusUrl": f"{router.prefix}/jobs/{job.id}",
+        }
+
+    # Parsing, database writes and Supabase RPCs all block, so they run on the import
+    # executor and the event loop stays free for /health and analytics requests
+    # The copied context carries this request's Server-Timing recorder into the worker
+    loop = asyncio.get_running_loop()
+    with timed_phase("import"):
+        result = await loop.run_in_executor(
+            import_executor,
+            functools.partial(contextvars.copy_context().run, run_attendance_import, file.file, **import_kwargs),
+        )
+
+    # Rebuild dashboard snapshots in the background; readers use live queries until then
+    if SNAPSHOTS_ENABLED:
+        schedule_snapshot_refresh()
+
+    # Stream the result (it echoes skipped rows) instead of encoding it in one piece
+    return StreamingResponse(iter_json(result), media_type="application/json")
+
+def run_import_job(job: ImportJob, upload: BinaryIO, import_kwargs: Dict[str, Any]) -> None:
+    """Runs a queued import on the import executor, recording its progress and outcome on job"""
+    import_jobs.start(job)
+    try:
+        result = run_attendance_import(
+            upload,
+            progress=lambda stage, rows_processed: import_jobs.progress(job, stage, rows_processed),
+            **import_kwargs,
+        )
+    except HTTPException as e:
+        import_jobs.fail(job, str(e.detail))
+        return
+    except Exception as e:
+        logger.exception("Import job %s failed", job.id)
+        import_jobs.fail(job, _safe_error_message(e))
+        return
+    finally:
+        upload.close()
+
+    import_jobs.succeed(job, result)
+    if SNAPSHOTS_ENABLED:
+        schedule_snapshot_refresh()
+
+@router.get("/jobs/{job_id}")
+def get_import_job(job_id: str):
+    job = import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+def run_attendance_import(
+    upload: BinaryIO,
+    *,
+    title: str,
+    starts_at_iso: str,
+    event_kind: str,
+    event_type: Optional[str],
+    location: Optional[str],
+    committee: Optional[str],
+    filename: str,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Imports one validated attendance upload and returns the response payload.
+    Blocking: parses the CSV, writes the event and its attendance, then runs the
+    Supabase RPCs. Raises HTTPException for bad input or failed writes.
+
+    progress, when given, is called with (stage, rows_processed) as the import advances.
+    """
+    report_progress = progress or (lambda stage, rows_processed: None)
+    supabase = get_supabase()
+
+    # Decode and parse the upload incrementally instead of holding it in memory
+    reader = csv.DictReader(iter_upload_lines(upload))
     headers = reader.fieldnames or []
 
     # Detect headers
@@ -330,7 +802,7 @@ async def import_event_attendance(
     email_col = find_header(headers, EMAIL_HEADER_ALIASES)
     if not email_col:
         raise HTTPException(status_code=400, detail = "CSV must include an email column (Email / SJSU Email / Email Address).")
-    
+
     major_col = find_header(headers, MAJOR_HEADER_ALIASES)
     program_col = find_header(headers, PROGRAM_HEADER_ALIASES) # class year col
     checkin_col = find_header(headers, CHECKIN_HEADER_ALIASES) # timestamp col
@@ -339,10 +811,10 @@ async def import_event_attendance(
     event_payload = {
         "title": title,
         "starts_at": starts_at_iso,
-        "event_kind": ek,
-        "event_type": et,
-        "location": (location or "").strip() or None,
-        "committee": (committee or "").strip() or None,
+        "event_kind": event_kind,
+        "event_type": event_type,
+        "location": location,
+        "committee": committee,
         "metadata": {
             "source": "admin_import",
             "filename": filename,
@@ -353,33 +825,6 @@ async def import_event_attendance(
         },
     }
 
-    try:
-        event_insert = supabase.table("events").insert(event_payload).execute()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create event: {_safe_error_message(e)}")
-
-    if not event_insert.data:
-        raise HTTPException(status_code=500, detail="Failed to insert event")
-
-    event_id = event_insert.data[0]["id"] # Generated UUID
-
-    # Load members once for fast lookup
-    try:
-        members_resp = supabase.table("members").select(
-            "email,major_raw,major_normalized,major_category,degree_program"
-        ).execute()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to load members: {_safe_error_message(e)}")
-
-    members = members_resp.data or []
-
-    members_by_email = {}
-    for m in members:
-        email = m.get("email")
-        if email:
-            key = normalize_email(email)
-            members_by_email[key] = m
-
     # Row processing stats
     rows_received = 0
     rows_skipped = 0
@@ -390,163 +835,155 @@ async def import_event_attendance(
     warn_bad_checkin = 0
     warn_duplicate_email = 0
 
-    attendance_rows: List[Dict[str, Any]] = []
     seen_emails: Set[str] = set()
+    affected_members: Set[str] = set()
     skipped_rows: List[Dict[str, Any]] = []
 
-    for row in reader:
-        # Check for empty or missing row
-        if not row or all((v or "").strip() == "" for v in row.values()):
-            continue 
-
-        rows_received += 1
-        row_number = rows_received
-        email_raw = (row.get(email_col) or "").strip()
-        
-        # Think about this design 
-        if not email_raw:
-            rows_skipped += 1
-            skipped_rows.append({
-                "row_number": row_number,
-                "reason": "Missing email",
-                "row": row,
-            })
-            continue 
-
-        attendee_email = normalize_email(email_raw)
-
-        # Prevent duplicates within same CSV file
-        if attendee_email in seen_emails:
-            warn_duplicate_email += 1
-            rows_skipped += 1
-            skipped_rows.append({
-                "row_number": row_number,
-                "reason": "Duplicate email in CSV",
-                "row": row,
-            })
-            continue
-        seen_emails.add(attendee_email)
-
-        member = members_by_email.get(attendee_email)
-
-        major_raw_csv = (row.get(major_col) or "").strip() if major_col else ""
-        # NOTE: way we find program is actually need to do more logic -> based on response "Freshman", "Sophomore", "Junior"... "Grad" -> separates into undergrad and grad
-        class_year_raw = (row.get(program_col) or "").strip() if program_col else ""
-        # NOTE: always will have check in col 
-        checkin_raw = (row.get(checkin_col) or "").strip() if checkin_col else ""
-
-        # Check-in timestamp but do not fail the entire upload if one row is bad
-        check_in_iso = None
-        check_in_parse_error = None
-        if checkin_raw:
-            try:
-                check_in_iso = parse_check_in_at(checkin_raw)
-            except HTTPException as e:
-                warn_bad_checkin += 1
-                check_in_iso = None
-                check_in_parse_error = str(e.detail)
-        
-        # Determine program (Undergrad/Grad/Unknown) from class standing, inferred major tokens, or member row
-        used_program_source = "unknown"
-        attendee_program = "Unknown"
-        if class_year_raw:
-            used_program_source = "class_year"
-            attendee_program = normalize_class_year_to_program(class_year_raw)
-            if attendee_program == "Unknown":
-                warn_missing_program += 1
-        else:
-            inferred = infer_degree_program_from_major_raw(major_raw_csv or "")
-            if inferred:
-                used_program_source = "inferred_from_major"
-                attendee_program = inferred
-            elif member and (member.get("degree_program") or "").strip():
-                used_program_source = "members"
-                attendee_program = (member.get("degree_program") or "").strip()
-            else:
-                warn_missing_program += 1
-        
-        # Determine major/category from CSV first, then member row, else Unknown
-        used_major_source = "unknown"
-        attendee_major_raw = None
-        attendee_major_normalized = "Unknown"
-        attendee_major_category = "Other/Unknown"
-
-        if major_raw_csv:
-            used_major_source = "csv"
-            attendee_major_raw = major_raw_csv
-            attendee_major_normalized, attendee_major_category = normalize_major_and_category(major_raw_csv)
-        elif member:
-            used_major_source = "members"
-            attendee_major_raw = member.get("major_raw")
-            attendee_major_normalized = member.get("major_normalized") or "Unknown"
-            attendee_major_category = member.get("major_category") or "Other/Unknown"
-        else:
-            warn_missing_major += 1
-        
-        # Link attendance to members table using canonical stored email so FK always matches.
-        member_email = (member.get("email") if member else None)
-
-        # Separate known columns vs extras for metadata debugging
-        recognized_cols = {email_col}
-        if major_col:
-            recognized_cols.add(major_col)
-        if program_col:
-            recognized_cols.add(program_col)
-        if checkin_col:
-            recognized_cols.add(checkin_col)
-
-        extra_cols = {k: v for k, v in row.items() if k not in recognized_cols}
-
-        attendance_rows.append({
-            "event_id": event_id,
-            "attendee_email": attendee_email,
-            "member_email": member_email,
-            "attendee_major_raw": attendee_major_raw,
-            "attendee_major_normalized": attendee_major_normalized,
-            "attendee_major_category": attendee_major_category,
-            "attendee_program": attendee_program,
-            "check_in_at": check_in_iso,
-            "metadata": {
-                "raw_row": row,  # includes everything
-                "extra_columns": extra_cols,  # explicitly highlights extras
-                "used_major_source": used_major_source,
-                "used_program_source": used_program_source,
-                "check_in_raw": checkin_raw or None,
-                "check_in_parse_error": check_in_parse_error,  # None if ok
-            },
-        })
-    
-    if attendance_rows:
-        try:
-            supabase.table("event_attendance").upsert(
-                attendance_rows,
-                on_conflict = "event_id,attendee_email"
-            ).execute()
-        except Exception as e:
-            # Avoid leaving an orphaned event row when attendance import fails.
+    # Separate known columns vs extras for metadata debugging
+    recognized_cols = {c for c in (email_col, major_col, program_col, checkin_col) if c}
+
+    # Rows are parsed and normalized in batches of IMPORT_BATCH_ROWS and spooled to a temp
+    # file in COPY format before the ingest transaction opens, so the transaction only
+    # covers the writes. The event and its attendance commit together, so a failed import
+    # leaves no orphaned event
+    attendance_spool = tempfile.TemporaryFile(mode="w+", encoding="utf-8", newline="")
+    try:
+        with timed_phase("import.parse"):
+            for batch in iter_row_batches(reader, IMPORT_BATCH_ROWS):
+                # Look up only the members whose emails appear in this batch
+                batch_emails = {
+                    normalize_email(row.get(email_col) or "")
+                    for row in batch
+                    if row and (row.get(email_col) or "").strip()
+                }
+                try:
+                    with get_conn() as conn:
+                        members_by_email = fetch_members_by_email(conn, batch_emails - seen_emails)
+                except Exception as e:
+                    raise HTTPException(status_code=500, detail=f"Failed to load members: {_safe_error_message(e)}")
+
+                for row in batch:
+                    # Check for empty or missing row
+                    if not row or all((v or "").strip() == "" for v in row.values()):
+                        continue
+
+                    rows_received += 1
+                    row_number = rows_received
+                    email_raw = (row.get(email_col) or "").strip()
+
+                    # Think about this design
+                    if not email_raw:
+                        rows_skipped += 1
+                        if len(skipped_rows) < SKIPPED_ROWS_REPORT_LIMIT:
+                            skipped_rows.append({
+                                "row_number": row_number,
+                                "reason": "Missing email",
+                                "row": row,
+                            })
+                        continue
+
+                    attendee_email = normalize_email(email_raw)
+
+                    # Prevent duplicates within same CSV file
+                    if attendee_email in seen_emails:
+                        warn_duplicate_email += 1
+                        rows_skipped += 1
+                        if len(skipped_rows) < SKIPPED_ROWS_REPORT_LIMIT:
+                            skipped_rows.append({
+                                "row_number": row_number,
+                                "reason": "Duplicate email in CSV",
+                                "row": row,
+                            })
+                        continue
+                    seen_emails.add(attendee_email)
+
+                    attendance_row, row_warnings = normalize_attendance_row(
+                        row,
+                        attendee_email,
+                        members_by_email.get(attendee_email),
+                        major_col=major_col,
+                        program_col=program_col,
+                        checkin_col=checkin_col,
+                        recognized_cols=recognized_cols,
+                    )
+                    warn_bad_checkin += "bad_checkin" in row_warnings
+                    warn_missing_program += "missing_program" in row_warnings
+                    warn_missing_major += "missing_major" in row_warnings
+
+                    write_attendance_copy_row(attendance_spool, attendance_row)
+                    rows_imported += 1
+                    if attendance_row["member_email"]:
+                        affected_members.add(attendance_row["member_email"])
+                report_progress("parsing", rows_received)
+
+        # Throughput covers the ingest transaction only, not parsing
+        ingest_started = time.perf_counter()
+        with timed_phase("import.ingest"), get_conn() as conn:
+            report_progress("importing", rows_received)
             try:
-                supabase.table("events").delete().eq("id", event_id).execute()
-            except Exception:
-                pass
-            raise HTTPException(status_code=500, detail=f"Failed to import attendance rows: {_safe_error_message(e)}")
+                event_id = insert_event(conn, event_payload)
+                create_attendance_staging(conn)
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Failed to create event: {_safe_error_message(e)}")
+
+            if rows_imported:
+                try:
+                    copy_attendance_spool(conn, attendance_spool)
+                    merge_attendance_staging(conn, event_id)
+                except Exception as e:
+                    raise HTTPException(status_code=500, detail=f"Failed to import attendance rows: {_safe_error_message(e)}")
+                try:
+                    refresh_event_stats(conn, event_id)
+                except Exception as e:
+                    raise HTTPException(status_code=500, detail=f"Failed to compute event stats: {_safe_error_message(e)}")
+            conn.commit()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to import event: {_safe_error_message(e)}")
+    finally:
+        attendance_spool.close()
+    ingest_seconds = time.perf_counter() - ingest_started
+
+    throughputSummary = {
+        "rowsIngested": rows_imported,
+        "ingestSeconds": round(ingest_seconds, 3),
+        "rowsPerSecond": round(rows_imported / ingest_seconds, 1) if ingest_seconds > 0 else None,
+    }
+    logger.info(
+        "Imported %d attendance rows for event %s in %.3fs",
+        rows_imported,
+        event_id,
+        ingest_seconds,
+    )
 
-        rows_imported = len(attendance_rows)
+    if rows_imported:
+        report_progress("recomputing", rows_received)
 
         # Only members can become active; recompute for affected member emails only
-        affected_members = sorted({r["member_email"] for r in attendance_rows if r["member_email"]})
-        
         if affected_members:
             try:
-                supabase.rpc("recompute_active_members", {"emails": affected_members}).execute()
+                with timed_phase("import.rpc.recompute_active_members"):
+                    supabase.rpc("recompute_active_members", {"emails": sorted(affected_members)}).execute()
             except Exception as e:
                 warnings = [f"Attendance imported, but active-member recompute failed: {_safe_error_message(e)}"]
             else:
                 warnings = []
         else:
             warnings = []
+
+        # Keep the per-member attendance rollup current for this upload's emails only.
+        # Every imported row's attendee email was recorded in seen_emails first.
+        try:
+            with timed_phase("import.rpc.refresh_member_attendance_rollup"):
+                supabase.rpc("refresh_member_attendance_rollup", {"emails": sorted(seen_emails)}).execute()
+        except Exception as e:
+            warnings.append(f"Attendance imported, but attendance rollup refresh failed: {_safe_error_message(e)}")
     else:
         warnings = []
 
+    invalidate_analytics_cache(starts_at_iso)
+
     if warn_missing_major:
         warnings.append(f"{warn_missing_major} rows had no major and were not members → Unknown/Other.")
     if warn_missing_program:
@@ -571,10 +1008,8 @@ async def import_event_attendance(
         "event_id": event_id,
         "validationSummary": validationSummary,
         "successSummary": successSummary,
+        "throughputSummary": throughputSummary,
         "skippedRows": skipped_rows,
+        "skippedRowsTruncated": rows_skipped > len(skipped_rows),
         "warnings": warnings,
     }
-
-            
-
-    
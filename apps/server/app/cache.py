@@ -0,0 +1,133 @@
+"""
+In-process result cache for analytics payloads.
+
+Entries are keyed by (endpoint, semester_start, semester_end, variant), evicted
+LRU once the cache is full and expired after a TTL. The routes use variant for the
+data version the payload was built at (see app.services.data_version) plus any
+options that change the payload, such as the number of events in the mission
+diversity chart. Imports invalidate the entries whose data they can change, and
+entries built at an older data version simply stop matching, so a worker the
+import never reached does not serve a stale body under the current ETag.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Hashable, Optional
+
+CacheKey = tuple[str, Optional[date], Optional[date], Hashable]
+
+
+def _get_env_number(key: str, default: float) -> float:
+    value = os.getenv(key)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise RuntimeError(f"{key} must be a number")
+
+
+class ResultCache:
+    def __init__(self, *, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[CacheKey, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidate(); a build only stores its result if no
+        # invalidation happened while it ran
+        self._generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get_or_build(
+        self,
+        endpoint: str,
+        semester_start: Optional[date],
+        semester_end: Optional[date],
+        build: Callable[[], Any],
+        variant: Hashable = None,
+    ) -> tuple[Any, bool]:
+        """Returns (payload, hit). Cached payloads are shared; callers must not mutate them."""
+        if not self.enabled:
+            return build(), False
+
+        key = (endpoint, semester_start, semester_end, variant)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], True
+            self.misses += 1
+            generation = self._generation
+
+        # Build outside the lock so a slow query does not block other endpoints
+        value = build()
+
+        with self._lock:
+            if generation != self._generation:
+                # An import invalidated entries mid-build; the value may predate it
+                return value, False
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return value, False
+
+    def invalidate(
+        self,
+        *,
+        on_date: Optional[date] = None,
+        endpoints: Optional[set[str]] = None,
+    ) -> int:
+        """
+        Drops cached entries and returns how many were removed.
+
+        With no arguments the whole cache is cleared. on_date limits removal to
+        unbounded ("all") windows and windows containing that date; endpoints
+        are always removed for every window and variant.
+        """
+        with self._lock:
+            self._generation += 1
+            if on_date is None and endpoints is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+
+            stale = [
+                key
+                for key in self._entries
+                if (endpoints is not None and key[0] in endpoints)
+                or (
+                    on_date is not None
+                    and (key[1] is None or key[2] is None or key[1] <= on_date < key[2])
+                )
+            ]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+analytics_cache = ResultCache(
+    max_entries=int(_get_env_number("ANALYTICS_CACHE_MAX_ENTRIES", 128)),
+    ttl=_get_env_number("ANALYTICS_CACHE_TTL_SECONDS", 300),
+)
@@ -0,0 +1,85 @@
+"""
+Applies pending SQL migrations from migrations/ in version order.
+
+Applied versions (the numeric filename prefix) are recorded in
+public.schema_migrations, and each migration runs in its own transaction together
+with its record, so a failed migration leaves nothing half-applied. Databases
+migrated before this table existed can simply run it: migrations 0001-0003 are
+idempotent and get recorded on the first run.
+
+Usage (from apps/server):
+    python -m app.commands.migrate [--status] [--check-indexes]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+from app.db import get_conn
+from app.schema_check import find_missing_indexes
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+MIGRATION_FILE_RE = re.compile(r"^(\d{4})_[a-z0-9_]+\.sql$")
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS public.schema_migrations (
+    version text PRIMARY KEY,
+    name text NOT NULL,
+    applied_at timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+
+def list_migrations() -> list[tuple[str, Path]]:
+    migrations = []
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        match = MIGRATION_FILE_RE.match(path.name)
+        if match is None:
+            raise RuntimeError(f"Unexpected migration file name: {path.name}")
+        migrations.append((match.group(1), path))
+    return migrations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations only")
+    parser.add_argument("--check-indexes", action="store_true", help="exit 1 if an expected index is missing")
+    args = parser.parse_args()
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(CREATE_TABLE_SQL)
+            cur.execute("SELECT version FROM public.schema_migrations;")
+            applied = {row["version"] for row in cur.fetchall()}
+        conn.commit()
+
+        for version, path in list_migrations():
+            if version in applied:
+                print(f"{path.name}: applied")
+                continue
+            if args.status:
+                print(f"{path.name}: pending")
+                continue
+            with conn.cursor() as cur:
+                cur.execute(path.read_text())
+                cur.execute(
+                    "INSERT INTO public.schema_migrations (version, name) VALUES (%s, %s);",
+                    (version, path.name),
+                )
+            conn.commit()
+            print(f"{path.name}: applied now")
+
+        missing = find_missing_indexes(conn)
+        conn.rollback()
+
+    for expected in missing:
+        print(f"missing index on public.{expected.table} {expected.definition} (migrations/{expected.migration})")
+    if args.check_indexes and missing:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Full rebuild of public.member_attendance_rollup from event_attendance.
+
+Imports keep the rollup current for the emails they touch; run this after a
+backfill, a manual data fix, or when first applying migrations/0002.
+
+Usage (from apps/server):
+    python -m app.commands.rebuild_attendance_rollup
+"""
+
+from app.db import get_conn
+
+
+def main() -> None:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT public.rebuild_member_attendance_rollup() AS rows_written;")
+            rows_written = cur.fetchone()["rows_written"]
+        conn.commit()
+
+    print(f"Rebuilt member attendance rollup: {rows_written} rows")
+
+
+if __name__ == "__main__":
+    main()
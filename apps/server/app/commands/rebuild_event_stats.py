@@ -0,0 +1,26 @@
+"""
+Full rebuild of public.event_stats from event_attendance.
+
+Imports write the stats of the event they create; run this after a backfill, a
+manual data fix, or when member majors change, since each event's breakdown uses
+the member's major category at the time it was computed.
+
+Usage (from apps/server):
+    python -m app.commands.rebuild_event_stats
+"""
+
+from app.db import get_conn
+
+
+def main() -> None:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT public.rebuild_event_stats() AS rows_written;")
+            rows_written = cur.fetchone()["rows_written"]
+        conn.commit()
+
+    print(f"Rebuilt event stats: {rows_written} rows")
+
+
+if __name__ == "__main__":
+    main()
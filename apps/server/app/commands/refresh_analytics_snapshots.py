@@ -0,0 +1,84 @@
+"""
+Refresh public.analytics_snapshots for "all" and every semester.
+
+All payloads are recomputed live and written in one transaction, so dashboard
+readers keep getting the previous snapshot until the refresh commits. Imports run
+this in the background when ANALYTICS_USE_SNAPSHOTS is enabled.
+
+Snapshots are stamped with the data version read before any payload is computed,
+so a write that lands mid-refresh leaves them stale rather than mislabelled.
+
+Usage (from apps/server):
+    python -m app.commands.refresh_analytics_snapshots
+"""
+
+import logging
+import time
+
+from psycopg2.extensions import connection as Connection
+
+from app.db import get_conn
+from app.services.data_version import fetch_data_version
+from app.services.mission import build_mission_payload
+from app.services.overview import build_overview_payload
+from app.services.retention import build_retention_payload
+from app.services.semester import _bounds_for_term, _parse_semester_value, list_semester_options
+from app.services.snapshot import write_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key so overlapping refreshes skip instead of queueing
+_REFRESH_LOCK_KEY = 7_241_001
+
+
+def refresh_analytics_snapshots(conn: Connection) -> int:
+    """Recomputes every snapshot and returns the number written (0 if another refresh holds the lock)."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_xact_lock(%s) AS locked;", (_REFRESH_LOCK_KEY,))
+        if not cur.fetchone()["locked"]:
+            conn.rollback()
+            return 0
+
+    data_version = fetch_data_version(conn).etag()
+
+    windows = [("all", None, None)]
+    for option in list_semester_options(conn)[1:]:
+        year, term = _parse_semester_value(option["value"])
+        windows.append((option["value"], *_bounds_for_term(year, term)))
+
+    snapshots = []
+    for semester_key, semester_start, semester_end in windows:
+        window = {"semester_start": semester_start, "semester_end": semester_end}
+        snapshots.append(("overview", semester_key, build_overview_payload(conn, **window)))
+        snapshots.append(("retention", semester_key, build_retention_payload(conn, **window)))
+        snapshots.append(("mission", semester_key, build_mission_payload(conn, **window)))
+
+    write_snapshots(conn, snapshots, data_version)
+    conn.commit()
+    return len(snapshots)
+
+
+def refresh_analytics_snapshots_in_background() -> None:
+    """Entry point for FastAPI background tasks; failures are logged, never raised."""
+    started = time.perf_counter()
+    try:
+        with get_conn() as conn:
+            written = refresh_analytics_snapshots(conn)
+    except Exception as e:
+        logger.exception("Analytics snapshot refresh failed: %s", e)
+        return
+    logger.info(
+        "Refreshed %d analytics snapshots in %.2fs",
+        written,
+        time.perf_counter() - started,
+    )
+
+
+def main() -> None:
+    with get_conn() as conn:
+        written = refresh_analytics_snapshots(conn)
+    print(f"Refreshed analytics snapshots: {written} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
 import os
+import threading
+import time
 from contextlib import contextmanager
 
 from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extensions import connection as Connection
-from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+
+from app.query_metrics import InstrumentedCursor
+from app.server_timing import timed_phase
 
 load_dotenv()
 
@@ -15,22 +20,193 @@ def _get_env_value(*keys: str) -> str | None:
             return value
     return None
 
-def _get_connection_kwargs() -> dict[str, str]:
+def _get_env_number(key: str, default: float) -> float:
+    value = _get_env_value(key)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise RuntimeError(f"{key} must be a number")
+
+def _get_connection_kwargs() -> dict[str, str | int]:
     db_url = _get_env_value("DATABASE_URL")
     if not db_url:
         raise RuntimeError("DATABASE_URL is required")
-    return {"dsn": db_url}
-    
-# The context manager yields a database connection and ensures it is closed after use
-@contextmanager
-def get_conn() -> Connection:
-    conn = None
-    try:
+    # Bounds how long a checkout can spend opening a connection to an unreachable server
+    return {"dsn": db_url, "connect_timeout": int(_get_env_number("DB_CONNECT_TIMEOUT_SECONDS", 5))}
+
+class PoolTimeoutError(RuntimeError):
+    pass
+
+# Bounded, thread-safe pool of psycopg2 connections.
+# Connections are opened on demand up to max_size, pinged before reuse when they
+# have been idle for a while, and closed once they are older than max_age. Network
+# round trips (connects and pings) never run while holding the pool lock.
+class ConnectionPool:
+    def __init__(
+        self,
+        *,
+        max_size: int,
+        max_age: float,
+        timeout: float,
+        healthcheck_interval: float,
+    ):
+        if max_size < 1:
+            raise RuntimeError("DB_POOL_MAX_SIZE must be at least 1")
+        self.max_size = max_size
+        self.max_age = max_age
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+
+        self._cond = threading.Condition()
+        self._idle: list[tuple[Connection, float]] = []  # (conn, last_used_at)
+        self._created_at: dict[int, float] = {}
+        self._size = 0
+        self._closed = False
+
+    def _connect(self) -> Connection:
         conn = psycopg2.connect(
-            cursor_factory=RealDictCursor,
+            cursor_factory=InstrumentedCursor,
             **_get_connection_kwargs(),
         )
+        self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn: Connection) -> None:
+        # Caller must hold self._cond
+        self._created_at.pop(id(conn), None)
+        self._size -= 1
+        self._cond.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_expired(self, conn: Connection, now: float) -> bool:
+        created_at = self._created_at.get(id(conn), now)
+        return self.max_age > 0 and now - created_at >= self.max_age
+
+    def _is_usable(self, conn: Connection) -> bool:
+        return not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_UNKNOWN
+
+    def _ping(self, conn: Connection) -> bool:
+        # Runs without the lock, so a slow round trip only delays this checkout
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def getconn(self) -> Connection:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                conn = None
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+
+                    if self._idle:
+                        conn, last_used_at = self._idle.pop()
+                        now = time.monotonic()
+                        if self._is_expired(conn, now) or not self._is_usable(conn):
+                            self._discard(conn)
+                            conn = None
+                            continue
+                        needs_ping = now - last_used_at >= self.healthcheck_interval
+                        break
+
+                    if self._size < self.max_size:
+                        # Reserve a slot, then connect without holding the lock
+                        self._size += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.timeout:g}s waiting for a database connection"
+                        )
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                break
+            if not needs_ping or self._ping(conn):
+                return conn
+            # The slot stays reserved until the dead connection is discarded
+            with self._cond:
+                self._discard(conn)
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, conn: Connection) -> None:
+        # Never hand a connection with an open transaction to the next request
+        if not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+
+        with self._cond:
+            now = time.monotonic()
+            if (
+                self._closed
+                or conn.closed
+                or conn.get_transaction_status() != TRANSACTION_STATUS_IDLE
+                or self._is_expired(conn, now)
+            ):
+                self._discard(conn)
+                return
+            self._idle.append((conn, now))
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+# The pool is created on first use so importing this module never touches the database
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    max_size=int(_get_env_number("DB_POOL_MAX_SIZE", 10)),
+                    max_age=_get_env_number("DB_POOL_MAX_AGE_SECONDS", 1800),
+                    timeout=_get_env_number("DB_POOL_TIMEOUT_SECONDS", 10),
+                    healthcheck_interval=_get_env_number("DB_POOL_HEALTHCHECK_INTERVAL_SECONDS", 30),
+                )
+    return _pool
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+# The context manager yields a pooled database connection and returns it to the pool after use
+@contextmanager
+def get_conn() -> Connection:
+    pool = get_pool()
+    with timed_phase("db.acquire"):
+        conn = pool.getconn()
+    try:
         yield conn
     finally:
-        if conn is not None:
-            conn.close()
+        pool.putconn(conn)
@@ -0,0 +1,120 @@
+"""
+In-process registry for background attendance import jobs.
+
+Jobs are queued on the import executor, report their stage and row count while
+they run, and keep their final summaries for IMPORT_JOB_RETENTION_SECONDS after
+finishing so clients can poll for the outcome.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from typing import Any, Optional
+
+
+def _get_env_number(key: str, default: float) -> float:
+    value = os.getenv(key)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise RuntimeError(f"{key} must be a number")
+
+
+class ImportJob:
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = "queued"  # queued -> running -> succeeded | failed
+        self.stage = "queued"
+        self.rows_processed = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at is not None else 0.0
+        payload = {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "rowsProcessed": self.rows_processed,
+            "elapsedSeconds": round(elapsed, 3),
+            "rowsPerSecond": round(self.rows_processed / elapsed, 1) if elapsed > 0 else None,
+            "error": self.error,
+        }
+        if self.result is not None:
+            # The import's own "status" is always "ok"; the job status is what callers poll
+            payload.update({k: v for k, v in self.result.items() if k != "status"})
+        return payload
+
+
+class ImportJobRegistry:
+    def __init__(self, *, retention: float, max_jobs: int):
+        self.retention = retention
+        self.max_jobs = max_jobs
+        self._jobs: dict[str, ImportJob] = {}
+        self._lock = threading.Lock()
+
+    def create(self) -> ImportJob:
+        job = ImportJob(uuid.uuid4().hex)
+        with self._lock:
+            self._prune(time.time())
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        """Returns a snapshot of the job's state, or None when it is unknown or expired."""
+        with self._lock:
+            self._prune(time.time())
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def start(self, job: ImportJob) -> None:
+        with self._lock:
+            job.status = "running"
+            job.stage = "starting"
+            job.started_at = time.time()
+
+    def progress(self, job: ImportJob, stage: str, rows_processed: int) -> None:
+        with self._lock:
+            job.stage = stage
+            job.rows_processed = rows_processed
+
+    def succeed(self, job: ImportJob, result: dict[str, Any]) -> None:
+        with self._lock:
+            job.status = "succeeded"
+            job.stage = "done"
+            job.result = result
+            job.finished_at = time.time()
+
+    def fail(self, job: ImportJob, error: str) -> None:
+        with self._lock:
+            job.status = "failed"
+            job.error = error
+            job.finished_at = time.time()
+
+    def _prune(self, now: float) -> None:
+        # Caller must hold self._lock. Finished jobs expire after the retention
+        # window; past max_jobs the oldest finished jobs go first.
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished_at is not None),
+            key=lambda job: job.finished_at,
+        )
+        overflow = len(self._jobs) - self.max_jobs
+        for job in finished:
+            if now - job.finished_at >= self.retention or overflow > 0:
+                del self._jobs[job.id]
+                overflow -= 1
+
+
+import_jobs = ImportJobRegistry(
+    retention=_get_env_number("IMPORT_JOB_RETENTION_SECONDS", 3600),
+    max_jobs=int(_get_env_number("IMPORT_JOB_MAX_ENTRIES", 256)),
+)
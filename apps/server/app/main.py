@@ -5,6 +5,7 @@ This module initializes the FastAPI app, configures CORS middleware, and registe
 route handlers for analytics and event import functionality.
 """
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Dict, Any
 
@@ -13,7 +14,9 @@ try:
 except ModuleNotFoundError:
     load_dotenv = None
 from fastapi import FastAPI, Header, HTTPException, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
 # Load environment variables before importing local modules that depend on them
 ENV_PATH = Path(__file__).resolve().parents[1] / ".env"  # -> apps/server/.env
@@ -21,14 +24,25 @@ if load_dotenv is not None:
     load_dotenv(dotenv_path=ENV_PATH, override=True)
 
 # Local application imports (after env is loaded)
-from app.api.import_event_info import router as import_router 
-from app.routes.analytics import router as analytics_router
+from app.api.import_event_info import router as import_router, shutdown_import_executor
+from app.routes.analytics import router as analytics_router, section_executor
+from app.compression import CompressionMiddleware
+from app.db import close_pool
+from app.query_metrics import query_metrics
+from app.schema_check import report_missing_indexes
+from app.server_timing import ServerTimingMiddleware
+from app.supabase_client import close_supabase, warm_supabase
 
 # API Key Configuration
 INTERNAL_API_SECRET = os.getenv("INTERNAL_API_SECRET")
 if not INTERNAL_API_SECRET:
     raise ValueError("INTERNAL_API_SECRET environment variable is required")
 
+def has_valid_api_key(authorization: str | None) -> bool:
+    """Non-raising check of a "Bearer <token>" header, for middleware outside the routers."""
+    parts = (authorization or "").split()
+    return len(parts) == 2 and parts[0].lower() == "bearer" and parts[1] == INTERNAL_API_SECRET
+
 async def verify_api_key(authorization: str = Header(None)) -> Dict[str, Any]:
     """Verify API key from Authorization header."""
     if not authorization:
@@ -45,8 +59,22 @@ async def verify_api_key(authorization: str = Header(None)) -> Dict[str, Any]:
     
     return {"authenticated": True}
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Both are blocking network calls, so they run on the threadpool instead of the event loop.
+    # Build the shared Supabase client up front so the first import skips client setup
+    await run_in_threadpool(warm_supabase)
+    # Warn (without failing startup) when migrations that add analytics indexes are missing
+    await run_in_threadpool(report_missing_indexes)
+    yield
+    # Let in-flight imports and dashboard builds finish, then release pooled database and Supabase connections
+    shutdown_import_executor()
+    section_executor.shutdown(wait=True)
+    close_supabase()
+    close_pool()
+
 # Initialize FastAPI application
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Register route handlers with API key protection
 app.include_router(import_router, dependencies=[Depends(verify_api_key)])
@@ -82,6 +110,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses of at least COMPRESSION_MINIMUM_SIZE bytes (brotli when available, else gzip)
+app.add_middleware(CompressionMiddleware)
+
+# Server-Timing on analytics and import responses; ?profile=1 profiles the request
+# for API-key holders when REQUEST_PROFILING_ENABLED is set
+app.add_middleware(ServerTimingMiddleware, authorize=has_valid_api_key)
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+# Per-query SQL latency, row and error counts in the Prometheus text format
+@app.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(verify_api_key)])
+def metrics():
+    return PlainTextResponse(query_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
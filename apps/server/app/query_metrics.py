@@ -0,0 +1,216 @@
+"""
+Per-query SQL metrics and slow-query logging.
+
+Pooled connections (app.db) create InstrumentedCursor cursors, which time every
+execute() and COPY and record them under the current query name: the name set
+with named_query() around the statement, or "<module>.<function>" of the code
+that ran it. Latency histograms, rows and call/error counts per name are served
+in the Prometheus text format on /metrics, and each statement also counts toward
+the request's Server-Timing header. Statements slower than
+SLOW_QUERY_THRESHOLD_MS are logged with their semester window and parameters,
+with email addresses and list parameters (batches of emails in the importer)
+redacted to their size.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from psycopg2.extras import RealDictCursor
+
+from app.server_timing import record_phase
+from app.services.semester import semester_key_for_window
+
+logger = logging.getLogger(__name__)
+
+QUERY_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 0 logs every statement; a negative value turns the slow-query log off
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+SLOW_QUERY_PARAMS_MAX_CHARS = 500
+
+_query_name: ContextVar[Optional[str]] = ContextVar("query_name", default=None)
+
+# Frames from these modules are skipped when naming a statement by its caller
+_INTERNAL_MODULE_PREFIXES = (__name__, "psycopg2")
+
+
+@contextmanager
+def named_query(name: str) -> Iterator[None]:
+    """Records the statements run inside the block as `name`."""
+    token = _query_name.set(name)
+    try:
+        yield
+    finally:
+        _query_name.reset(token)
+
+
+def _caller_name() -> str:
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(_INTERNAL_MODULE_PREFIXES):
+            return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _semester_label(params, *, analytics: bool) -> Optional[str]:
+    # Only the named analytics statements have a window; the rest (imports, the data
+    # version, DDL) get no label
+    if isinstance(params, dict) and "semester_start" in params and "semester_end" in params:
+        start, end = params["semester_start"], params["semester_end"]
+        return semester_key_for_window(start, end) or f"{start}..{end}"
+    return "all" if analytics else None
+
+
+def _redact_value(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return f"<{len(value)} items>"
+    if isinstance(value, str) and "@" in value:
+        return "<redacted>"
+    return value
+
+
+def _redact_params(params):
+    """Parameters safe to log: no email addresses and no list contents."""
+    if isinstance(params, dict):
+        return {key: _redact_value(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return tuple(_redact_value(value) for value in params)
+    return params
+
+
+class _QueryStats:
+    __slots__ = ("bucket_counts", "duration_sum", "calls", "rows", "errors")
+
+    def __init__(self, buckets: int):
+        self.bucket_counts = [0] * buckets
+        self.duration_sum = 0.0
+        self.calls = 0
+        self.rows = 0
+        self.errors = 0
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class QueryMetrics:
+    def __init__(self, buckets: tuple[float, ...] = QUERY_DURATION_BUCKETS):
+        self.buckets = buckets
+        self._stats: dict[str, _QueryStats] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, rows: int, *, error: bool = False) -> None:
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _QueryStats(len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    stats.bucket_counts[index] += 1
+                    break
+            stats.duration_sum += seconds
+            stats.calls += 1
+            stats.rows += rows
+            if error:
+                stats.errors += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            snapshot = {
+                name: (list(s.bucket_counts), s.duration_sum, s.calls, s.rows, s.errors)
+                for name, s in sorted(self._stats.items())
+            }
+
+        lines = [
+            "# HELP db_query_duration_seconds Time spent executing SQL statements, by query name.",
+            "# TYPE db_query_duration_seconds histogram",
+        ]
+        for name, (bucket_counts, duration_sum, calls, _, _) in snapshot.items():
+            label = _escape_label(name)
+            cumulative = 0
+            for bound, count in zip(self.buckets, bucket_counts):
+                cumulative += count
+                lines.append(f'db_query_duration_seconds_bucket{{query="{label}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'db_query_duration_seconds_bucket{{query="{label}",le="+Inf"}} {calls}')
+            lines.append(f'db_query_duration_seconds_sum{{query="{label}"}} {duration_sum:.6f}')
+            lines.append(f'db_query_duration_seconds_count{{query="{label}"}} {calls}')
+
+        lines += [
+            "# HELP db_query_rows_total Rows returned or affected by SQL statements, by query name.",
+            "# TYPE db_query_rows_total counter",
+        ]
+        for name, (_, _, _, rows, _) in snapshot.items():
+            lines.append(f'db_query_rows_total{{query="{_escape_label(name)}"}} {rows}')
+
+        lines += [
+            "# HELP db_query_errors_total SQL statements that raised, by query name.",
+            "# TYPE db_query_errors_total counter",
+        ]
+        for name, (_, _, _, _, errors) in snapshot.items():
+            lines.append(f'db_query_errors_total{{query="{_escape_label(name)}"}} {errors}')
+
+        return "\n".join(lines) + "\n"
+
+
+query_metrics = QueryMetrics()
+
+
+def _record(name: str, seconds: float, rows: int, params, semester: Optional[str], *, error: bool) -> None:
+    query_metrics.observe(name, seconds, rows, error=error)
+    record_phase(f"sql.{name}", seconds)
+    elapsed_ms = seconds * 1000
+    if SLOW_QUERY_THRESHOLD_MS >= 0 and elapsed_ms >= SLOW_QUERY_THRESHOLD_MS:
+        rendered_params = repr(_redact_params(params))
+        if len(rendered_params) > SLOW_QUERY_PARAMS_MAX_CHARS:
+            rendered_params = rendered_params[:SLOW_QUERY_PARAMS_MAX_CHARS] + "..."
+        logger.warning(
+            "Slow query %s took %.1f ms (rows=%d, semester=%s, params=%s)",
+            name,
+            elapsed_ms,
+            rows,
+            semester or "n/a",
+            rendered_params,
+        )
+
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor that records every statement in query_metrics."""
+
+    def execute(self, query, vars=None):
+        named = _query_name.get()
+        name = named or _caller_name()
+        semester = _semester_label(vars, analytics=named is not None)
+        started = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception:
+            _record(name, time.perf_counter() - started, 0, vars, semester, error=True)
+            raise
+        _record(name, time.perf_counter() - started, max(self.rowcount, 0), vars, semester, error=False)
+        return result
+
+    def copy_expert(self, sql, file, size=8192):
+        name = _query_name.get() or _caller_name()
+        started = time.perf_counter()
+        try:
+            result = super().copy_expert(sql, file, size)
+        except Exception:
+            _record(name, time.perf_counter() - started, 0, None, None, error=True)
+            raise
+        _record(name, time.perf_counter() - started, max(self.rowcount, 0), None, None, error=False)
+        return result
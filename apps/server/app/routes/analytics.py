@@ -1,25 +1,151 @@
+import contextvars
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from app.cache import analytics_cache
 from app.db import get_conn
+from app.server_timing import timed_phase
 from app.services.retention import build_retention_payload
 from app.services.overview import build_overview_payload
-from app.services.mission import build_mission_payload
-from app.services.semester import list_semester_options, resolve_semester_window
+from app.services.mission import DEFAULT_TOP_EVENTS, MAX_TOP_EVENTS, build_mission_payload
+from app.services.dashboard import build_dashboard_payload
+from app.services.data_version import DataVersion, fetch_data_version
+from app.services.semester import get_semester_options, resolve_semester_window, validate_semester
+from app.services.semester_summary import build_semester_summary_payload
+from app.services.payload_format import PayloadFormat, encode_payload
+from app.services.snapshot import SNAPSHOTS_ENABLED
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 logger = logging.getLogger(__name__)
 
+# Read retention buckets from public.member_attendance_rollup (migrations/0002)
+USE_ATTENDANCE_ROLLUP = os.getenv("ANALYTICS_USE_ATTENDANCE_ROLLUP", "").strip().lower() in {"1", "true", "yes"}
+
+# /analytics/ builds overview, retention and mission concurrently, each on its own pooled
+# connection, so it costs about as much as the slowest section. Set to 0 to use the single
+# combined statement (app.services.dashboard) on one connection instead.
+DASHBOARD_FANOUT = os.getenv("ANALYTICS_DASHBOARD_FANOUT", "1").strip().lower() in {"1", "true", "yes"}
+DASHBOARD_FANOUT_WORKERS = int(os.getenv("ANALYTICS_DASHBOARD_FANOUT_WORKERS", "8"))
+# There is no async driver, so sections run as blocking builders on threads over the pool
+section_executor = ThreadPoolExecutor(max_workers=DASHBOARD_FANOUT_WORKERS, thread_name_prefix="dashboard-section")
+
+# Responses carry ETag/Last-Modified, so the default makes clients revalidate every
+# time; ANALYTICS_CACHE_CONTROL_<ENDPOINT> (e.g. _SEMESTERS) overrides it per endpoint
+DEFAULT_CACHE_CONTROL = os.getenv("ANALYTICS_CACHE_CONTROL", "private, no-cache")
+CACHE_CONTROL = {
+    endpoint: os.getenv(f"ANALYTICS_CACHE_CONTROL_{endpoint.upper()}") or DEFAULT_CACHE_CONTROL
+    for endpoint in ("overview", "retention", "mission", "dashboard", "semesters", "by_semester")
+}
+
+def _set_cache_headers(response: Response, hit: bool) -> None:
+    stats = analytics_cache.stats()
+    response.headers["X-Cache"] = "HIT" if hit else "MISS"
+    response.headers["X-Cache-Hits"] = str(stats["hits"])
+    response.headers["X-Cache-Misses"] = str(stats["misses"])
+
+def _matches_etag(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored on both sides
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+def _is_unmodified_since(if_modified_since: str, last_modified) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+def _check_not_modified(
+    request: Request, conn, endpoint: str, *parts
+) -> tuple[dict[str, str], Response | None, DataVersion]:
+    """
+    Computes the validators for the current data version and returns (headers, 304
+    response or None, version). Runs before any payload builder, so a match costs
+    one query. Callers key cached payloads by the version, so a body built before
+    an import (or cached by another worker) is never served under a newer ETag.
+    """
+    with timed_phase("validate"):
+        version = fetch_data_version(
+            conn,
+            rollup_table="public.member_attendance_rollup" if USE_ATTENDANCE_ROLLUP else None,
+        )
+    etag = version.etag(endpoint, *parts)
+    last_modified = version.last_modified
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified.astimezone(timezone.utc), usegmt=True),
+        "Cache-Control": CACHE_CONTROL[endpoint],
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        not_modified = _matches_etag(if_none_match, etag)
+    elif if_modified_since is not None:
+        not_modified = _is_unmodified_since(if_modified_since, last_modified)
+    else:
+        not_modified = False
+
+    return headers, Response(status_code=304, headers=headers) if not_modified else None, version
+
+def _render_payload(
+    endpoint: str,
+    payload: dict,
+    payload_format: PayloadFormat,
+    hit: bool,
+    validators: dict[str, str],
+) -> Response:
+    # Serialized here rather than by FastAPI so both formats report their size and cost
+    with timed_phase("serialize"):
+        body, seconds = encode_payload(endpoint, payload, payload_format)
+    response = Response(content=body, media_type="application/json", headers=validators)
+    _set_cache_headers(response, hit)
+    response.headers["X-Payload-Bytes"] = str(len(body))
+    response.headers["X-Serialization-Ms"] = f"{seconds * 1000:.3f}"
+    return response
+
+def _resolve_semester(conn, semester: str | None):
+    with timed_phase("semester"):
+        return resolve_semester_window(conn, semester)
+
+def _get_or_build(endpoint: str, semester_start, semester_end, build, variant=None):
+    with timed_phase(f"build.{endpoint}"):
+        return analytics_cache.get_or_build(endpoint, semester_start, semester_end, build, variant)
+
 @router.get("/retention")
-def retention(semester: str | None = Query(default=None)):
+def retention(
+    request: Request,
+    semester: str | None = Query(default=None),
+    payload_format: PayloadFormat = Query(default="rows", alias="format"),
+):
     try:
+        # Malformed values get their 400 before a pool connection is checked out
+        validate_semester(semester)
         with get_conn() as conn:
-            semester_start, semester_end, _ = resolve_semester_window(conn, semester)
-            return build_retention_payload(
-                conn,
-                semester_start=semester_start,
-                semester_end=semester_end,
+            semester_start, semester_end, _ = _resolve_semester(conn, semester)
+            validators, not_modified, version = _check_not_modified(request, conn, "retention", semester or "all", payload_format)
+            if not_modified is not None:
+                return not_modified
+            payload, hit = _get_or_build(
+                "retention",
+                semester_start,
+                semester_end,
+                lambda: build_retention_payload(
+                    conn,
+                    semester_start=semester_start,
+                    semester_end=semester_end,
+                    use_rollup=USE_ATTENDANCE_ROLLUP,
+                    use_snapshot=SNAPSHOTS_ENABLED,
+                ),
+                variant=version,
             )
+            return _render_payload("retention", payload, payload_format, hit, validators)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -27,18 +153,40 @@ def retention(semester: str | None = Query(default=None)):
         raise HTTPException(status_code=500, detail="Failed to fetch retention analytics")
 
 @router.get("/overview") 
-def overview(semester: str | None = Query(default=None)):
+def overview(
+    request: Request,
+    semester: str | None = Query(default=None),
+    payload_format: PayloadFormat = Query(default="rows", alias="format"),
+):
     try:
+        validate_semester(semester)
         with get_conn() as conn:
-            semester_start, semester_end, options = resolve_semester_window(conn, semester)
-            payload = build_overview_payload(
-                conn,
-                semester_start=semester_start,
-                semester_end=semester_end,
+            semester_start, semester_end, options = _resolve_semester(conn, semester)
+            validators, not_modified, version = _check_not_modified(request, conn, "overview", semester or "all", payload_format)
+            if not_modified is not None:
+                return not_modified
+            payload, hit = _get_or_build(
+                "overview",
+                semester_start,
+                semester_end,
+                lambda: build_overview_payload(
+                    conn,
+                    semester_start=semester_start,
+                    semester_end=semester_end,
+                    use_snapshot=SNAPSHOTS_ENABLED,
+                ),
+                variant=version,
             )
-            payload["meta"]["selected_semester"] = semester or "all"
-            payload["meta"]["semester_options"] = options
-            return payload
+            # Cached payloads are shared, so add request-specific meta to a copy
+            payload = {
+                **payload,
+                "meta": {
+                    **payload["meta"],
+                    "selected_semester": semester or "all",
+                    "semester_options": options,
+                },
+            }
+            return _render_payload("overview", payload, payload_format, hit, validators)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -46,47 +194,117 @@ def overview(semester: str | None = Query(default=None)):
         raise HTTPException(status_code=500, detail="Failed to fetch overview analytics")
 
 @router.get("/mission") 
-def mission(semester: str | None = Query(default=None)):
+def mission(
+    request: Request,
+    semester: str | None = Query(default=None),
+    top_events: int = Query(default=DEFAULT_TOP_EVENTS, ge=1, le=MAX_TOP_EVENTS),
+    payload_format: PayloadFormat = Query(default="rows", alias="format"),
+):
     try:
+        validate_semester(semester)
         with get_conn() as conn:
-            semester_start, semester_end, _ = resolve_semester_window(conn, semester)
-            return build_mission_payload(
-                conn,
-                semester_start=semester_start,
-                semester_end=semester_end,
+            semester_start, semester_end, _ = _resolve_semester(conn, semester)
+            validators, not_modified, version = _check_not_modified(
+                request, conn, "mission", semester or "all", payload_format, top_events
             )
+            if not_modified is not None:
+                return not_modified
+            payload, hit = _get_or_build(
+                "mission",
+                semester_start,
+                semester_end,
+                lambda: build_mission_payload(
+                    conn,
+                    semester_start=semester_start,
+                    semester_end=semester_end,
+                    top_events=top_events,
+                    use_snapshot=SNAPSHOTS_ENABLED,
+                ),
+                variant=(version, top_events),
+            )
+            return _render_payload("mission", payload, payload_format, hit, validators)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.exception("Unexpected error in /analytics/mission: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch mission analytics")
 
+def _build_section(build, **kwargs):
+    with get_conn() as conn:
+        return build(conn, **kwargs)
+
+def _build_dashboard(semester_start, semester_end, top_events: int):
+    window = {"semester_start": semester_start, "semester_end": semester_end}
+    if not DASHBOARD_FANOUT:
+        return _build_section(
+            build_dashboard_payload,
+            **window,
+            top_events=top_events,
+            use_rollup=USE_ATTENDANCE_ROLLUP,
+            use_snapshot=SNAPSHOTS_ENABLED,
+        )
+
+    # Each section checks out its own connection and never holds one while waiting for
+    # another. The copied contexts carry this request's Server-Timing recorder along.
+    overview = section_executor.submit(
+        contextvars.copy_context().run,
+        _build_section,
+        build_overview_payload,
+        **window,
+        use_snapshot=SNAPSHOTS_ENABLED,
+    )
+    retention = section_executor.submit(
+        contextvars.copy_context().run,
+        _build_section,
+        build_retention_payload,
+        **window,
+        use_rollup=USE_ATTENDANCE_ROLLUP,
+        use_snapshot=SNAPSHOTS_ENABLED,
+    )
+    mission = _build_section(
+        build_mission_payload,
+        **window,
+        top_events=top_events,
+        use_snapshot=SNAPSHOTS_ENABLED,
+    )
+    return {
+        "overview": overview.result(),
+        "retention": retention.result(),
+        "mission": mission,
+    }
+
 @router.get("/")
-def analytics(semester: str | None = Query(default=None)):
+def analytics(
+    request: Request,
+    semester: str | None = Query(default=None),
+    top_events: int = Query(default=DEFAULT_TOP_EVENTS, ge=1, le=MAX_TOP_EVENTS),
+    payload_format: PayloadFormat = Query(default="rows", alias="format"),
+):
     try:
+        validate_semester(semester)
         with get_conn() as conn:
-            semester_start, semester_end, options = resolve_semester_window(conn, semester)
-            return {
-                "overview": build_overview_payload(
-                    conn,
-                    semester_start=semester_start,
-                    semester_end=semester_end,
-                ),
-                "retention": build_retention_payload(
-                    conn,
-                    semester_start=semester_start,
-                    semester_end=semester_end,
-                ),
-                "mission": build_mission_payload(
-                    conn,
-                    semester_start=semester_start,
-                    semester_end=semester_end,
-                ),
-                "meta": {
-                    "selected_semester": semester or "all",
-                    "semester_options": options,
-                },
-            }
+            semester_start, semester_end, options = _resolve_semester(conn, semester)
+            validators, not_modified, version = _check_not_modified(
+                request, conn, "dashboard", semester or "all", payload_format, top_events
+            )
+            if not_modified is not None:
+                return not_modified
+        # Released first: the builders check out their own connections
+        payload, hit = _get_or_build(
+            "dashboard",
+            semester_start,
+            semester_end,
+            lambda: _build_dashboard(semester_start, semester_end, top_events),
+            variant=(version, top_events),
+        )
+        payload = {
+            **payload,
+            "meta": {
+                "selected_semester": semester or "all",
+                "semester_options": options,
+            },
+        }
+        return _render_payload("dashboard", payload, payload_format, hit, validators)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -95,12 +313,45 @@ def analytics(semester: str | None = Query(default=None)):
 
 
 @router.get("/semesters")
-def semesters():
+def semesters(request: Request, response: Response):
     try:
         with get_conn() as conn:
+            validators, not_modified, version = _check_not_modified(request, conn, "semesters")
+            if not_modified is not None:
+                return not_modified
+            response.headers.update(validators)
+            options, hit = _get_or_build(
+                "semesters",
+                None,
+                None,
+                lambda: get_semester_options(conn)[0],
+                variant=version,
+            )
+            _set_cache_headers(response, hit)
             return {
-                "semester_options": list_semester_options(conn),
+                "semester_options": options,
             }
     except Exception as e:
         logger.exception("Unexpected error in /analytics/semesters: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch semester options")
+
+@router.get("/by-semester")
+def by_semester(request: Request, response: Response):
+    try:
+        with get_conn() as conn:
+            validators, not_modified, version = _check_not_modified(request, conn, "by_semester")
+            if not_modified is not None:
+                return not_modified
+            response.headers.update(validators)
+            payload, hit = _get_or_build(
+                "by_semester",
+                None,
+                None,
+                lambda: build_semester_summary_payload(conn),
+                variant=version,
+            )
+            _set_cache_headers(response, hit)
+            return payload
+    except Exception as e:
+        logger.exception("Unexpected error in /analytics/by-semester: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to fetch per-semester analytics")
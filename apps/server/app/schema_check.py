@@ -0,0 +1,99 @@
+"""
+Startup check for the indexes the analytics queries depend on.
+
+Each expected index is described by its table and the part of its definition
+after "USING btree", as pg_get_indexdef() prints it, so an index created under
+another name (e.g. by a UNIQUE constraint) still counts. Missing indexes are
+logged with the migration that creates them; the server starts either way.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import NamedTuple
+
+import psycopg2
+from psycopg2.extensions import connection as Connection
+
+from app.db import PoolTimeoutError, get_conn
+
+logger = logging.getLogger(__name__)
+
+
+class ExpectedIndex(NamedTuple):
+    table: str
+    definition: str
+    migration: str
+    reason: str
+
+
+EXPECTED_INDEXES = [
+    ExpectedIndex("events", "(starts_at)", "0001", "semester windows on events"),
+    ExpectedIndex("events", "(created_at)", "0003", "data version and snapshot freshness"),
+    ExpectedIndex("events", "(semester_key)", "0006", "semester filters and options"),
+    ExpectedIndex("members", "(email_normalized)", "0004", "member lookups by normalized email"),
+    ExpectedIndex("members", "(joined_at)", "0004", "registration windows in overview"),
+    ExpectedIndex(
+        "members",
+        "(active_member_start_date) WHERE (is_active_member = true)",
+        "0004",
+        "activation windows in overview",
+    ),
+    ExpectedIndex("event_attendance", "(event_id, attendee_email)", "0004", "attendance per event"),
+    ExpectedIndex(
+        "event_attendance",
+        "(attendee_email_normalized, event_id)",
+        "0004",
+        "per-person attendance counts",
+    ),
+    ExpectedIndex("event_stats", "(total_attendees DESC, event_id)", "0005", "top events in mission diversity"),
+]
+
+
+def _normalize(definition: str) -> str:
+    return " ".join(definition.split()).lower()
+
+
+def find_missing_indexes(conn: Connection, *, schema: str = "public") -> list[ExpectedIndex]:
+    tables = sorted({expected.table for expected in EXPECTED_INDEXES})
+    sql = """
+    SELECT tablename, indexdef
+    FROM pg_indexes
+    WHERE schemaname = %(schema)s
+      AND tablename = ANY(%(tables)s);
+    """
+
+    with conn.cursor() as cur:
+        cur.execute(sql, {"schema": schema, "tables": tables})
+        rows = cur.fetchall()
+
+    existing = {
+        (row["tablename"], _normalize(row["indexdef"].split(" USING btree ", 1)[-1]))
+        for row in rows
+        if " USING btree " in row["indexdef"]
+    }
+    return [
+        expected
+        for expected in EXPECTED_INDEXES
+        if (expected.table, _normalize(expected.definition)) not in existing
+    ]
+
+
+def report_missing_indexes() -> list[ExpectedIndex]:
+    """Logs a warning per missing index; an unreachable database is logged and ignored."""
+    try:
+        with get_conn() as conn:
+            missing = find_missing_indexes(conn)
+    except (psycopg2.Error, PoolTimeoutError, RuntimeError) as e:
+        logger.warning("Index check skipped: %s", e)
+        return []
+
+    for expected in missing:
+        logger.warning(
+            "Missing index on public.%s %s (%s); apply migrations/%s with python -m app.commands.migrate",
+            expected.table,
+            expected.definition,
+            expected.reason,
+            expected.migration,
+        )
+    return missing
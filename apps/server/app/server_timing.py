@@ -0,0 +1,235 @@
+"""
+Server-Timing breakdowns and on-demand profiling for analytics and import requests.
+
+ServerTimingMiddleware gives each matching request a recorder in a context
+variable; timed_phase() blocks and SQL statements (via app.query_metrics) add
+their durations to it from whichever thread runs them, and the totals go out in
+a Server-Timing header on the response.
+
+With REQUEST_PROFILING_ENABLED set, an authorized request with ?profile=1 is run
+under a sampling profiler that walks only the threads working on that request:
+worker threads while they are inside one of its timed phases, and the shared
+event loop thread while it is running the request's own task.
+Its response is replaced by the profile as folded stacks (one "frame;frame;...
+count" line per stack), which flamegraph.pl and speedscope read directly.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+SERVER_TIMING_PATH_PREFIXES = ("/analytics", "/api/import")
+
+PROFILING_ENABLED = os.getenv("REQUEST_PROFILING_ENABLED", "").strip().lower() in {"1", "true", "yes"}
+PROFILE_SAMPLE_INTERVAL_SECONDS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1")) / 1000
+
+
+class ServerTiming:
+    """Per-request phase durations, summed by name in first-seen order."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._phases: dict[str, list[float]] = {}  # name -> [seconds, count]
+        self._active_threads: Counter[int] = Counter()  # thread id -> open phases
+        self._lock = threading.Lock()
+
+    def enter_thread(self) -> None:
+        """Marks the calling thread as working on this request until leave_thread()."""
+        with self._lock:
+            self._active_threads[threading.get_ident()] += 1
+
+    def leave_thread(self) -> None:
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._active_threads[thread_id] -= 1
+            if self._active_threads[thread_id] <= 0:
+                del self._active_threads[thread_id]
+
+    def active_thread_ids(self) -> list[int]:
+        with self._lock:
+            return list(self._active_threads)
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            phase = self._phases.setdefault(name, [0.0, 0])
+            phase[0] += seconds
+            phase[1] += 1
+
+    def header_value(self) -> str:
+        with self._lock:
+            phases = [(name, seconds, count) for name, (seconds, count) in self._phases.items()]
+        entries = []
+        for name, seconds, count in phases:
+            entry = f"{name};dur={seconds * 1000:.1f}"
+            if count > 1:
+                entry += f';desc="{count} calls"'
+            entries.append(entry)
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[ServerTiming]] = ContextVar("server_timing", default=None)
+
+
+def record_phase(name: str, seconds: float) -> None:
+    """Adds a duration to the current request's Server-Timing; a no-op outside one."""
+    timing = _current.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+@contextmanager
+def timed_phase(name: str) -> Iterator[None]:
+    timing = _current.get()
+    if timing is not None:
+        # Pooled threads serve other requests between phases, so the profiler only
+        # samples a thread while it is inside one of this request's phases
+        timing.enter_thread()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - started)
+        if timing is not None:
+            timing.leave_thread()
+
+
+_IDLE_FRAMES = {("selectors", "select"), ("threading", "wait")}
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of a request's threads every interval until stopped. Create it
+    from the request's task: the event loop thread is shared with every other request,
+    so it is only sampled while that task is the one running. Work the request hands
+    to other tasks is not attributed to it.
+    """
+
+    def __init__(self, timing: ServerTiming, interval: float) -> None:
+        self.timing = timing
+        self.interval = interval
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._loop_thread_id = threading.get_ident()
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            thread_ids = set(self.timing.active_thread_ids())
+            thread_ids.discard(self._loop_thread_id)
+            if asyncio.current_task(self._loop) is self._task:
+                thread_ids.add(self._loop_thread_id)
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                # Skip threads parked in a wait; the time shows up in Server-Timing instead
+                if (frame.f_globals.get("__name__"), frame.f_code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{code.co_firstlineno}")
+                    frame = frame.f_back
+                self.samples[tuple(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ServerTimingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        authorize: Callable[[Optional[str]], bool],
+        path_prefixes: tuple[str, ...] = SERVER_TIMING_PATH_PREFIXES,
+        profiling_enabled: bool = PROFILING_ENABLED,
+        sample_interval: float = PROFILE_SAMPLE_INTERVAL_SECONDS,
+    ) -> None:
+        self.app = app
+        self.authorize = authorize
+        self.path_prefixes = path_prefixes
+        self.profiling_enabled = profiling_enabled
+        self.sample_interval = sample_interval
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        timing = ServerTiming()
+        token = _current.set(timing)
+        try:
+            if self._wants_profile(scope):
+                await self._profile(scope, receive, send, timing)
+                return
+
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append("Server-Timing", timing.header_value())
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+
+    def _wants_profile(self, scope: Scope) -> bool:
+        if not self.profiling_enabled:
+            return False
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if query.get("profile", [""])[-1] not in {"1", "true", "yes"}:
+            return False
+        return self.authorize(Headers(scope=scope).get("authorization"))
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send, timing: ServerTiming) -> None:
+        status = 500
+
+        async def capture(message: Message) -> None:
+            # The response itself is dropped; only its status is reported
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        profiler = SamplingProfiler(timing, self.sample_interval)
+        profiler.start()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            profiler.stop()
+
+        body = profiler.folded().encode("utf-8")
+        filename = f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded"
+        headers = [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+            (b"content-disposition", f'attachment; filename="{filename}"'.encode()),
+            (b"server-timing", timing.header_value().encode()),
+            (b"x-profile-samples", str(sum(profiler.samples.values())).encode()),
+            (b"x-profile-status", str(status).encode()),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,164 @@
+"""
+Combined analytics service for the full dashboard payload.
+
+Runs the overview, retention and mission aggregates in one statement so the shared
+per-person attendance set is materialized once per request instead of once per
+query. Event diversity keeps its typed rows and runs as a second statement.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from psycopg2.extensions import connection as Connection
+
+from app.query_metrics import named_query
+from app.server_timing import timed_phase
+from app.services.mission import DEFAULT_TOP_EVENTS, build_mission_queries, shape_mission_payload
+from app.services.overview import build_overview_queries, shape_overview_payload
+from app.services.retention import build_retention_queries, shape_retention_payload
+from app.services.semester import semester_key_for_window
+from app.services.snapshot import read_snapshots, snapshot_key_for_window, with_snapshot_age
+
+
+def build_dashboard_payload(
+    conn: Connection,
+    *,
+    members_table: str = "public.members",
+    events_table: str = "public.events",
+    attendance_table: str = "public.event_attendance",
+    event_stats_table: str = "public.event_stats",
+    semester_start: date | None = None,
+    semester_end: date | None = None,
+    top_events: int = DEFAULT_TOP_EVENTS,
+    use_rollup: bool = False,
+    rollup_table: str = "public.member_attendance_rollup",
+    use_snapshot: bool = False,
+):
+    """
+    Build the overview, retention and mission payloads in two round trips.
+
+    Returns {"overview": ..., "retention": ..., "mission": ...}, each identical to
+    what build_overview_payload, build_retention_payload and build_mission_payload
+    return for the same window.
+
+    With use_snapshot, all three sections come from precomputed snapshots when every
+    one of them is fresh and top_events is the default; otherwise everything is
+    computed live.
+    """
+
+    if use_snapshot and top_events == DEFAULT_TOP_EVENTS:
+        snapshot_key = snapshot_key_for_window(semester_start, semester_end)
+        sections = ["overview", "retention", "mission"]
+        snapshots = (
+            read_snapshots(conn, sections, snapshot_key)
+            if snapshot_key is not None
+            else {}
+        )
+        if len(snapshots) == len(sections):
+            return {
+                section: with_snapshot_age(*snapshots[section])
+                for section in sections
+            }
+
+    is_filtered = semester_start is not None and semester_end is not None
+    semester_key = semester_key_for_window(semester_start, semester_end)
+    read_rollup = use_rollup and (not is_filtered or semester_key is not None)
+
+    kpis_sql, time_series_sql, meta_sql = build_overview_queries(
+        members_table=members_table,
+        is_filtered=is_filtered,
+    )
+    per_person_ctes, overall_select, by_major_select = build_retention_queries(
+        members_table=members_table,
+        attendance_table=attendance_table,
+        events_table=events_table,
+        is_filtered=is_filtered,
+        by_semester_key=semester_key is not None,
+        rollup_table=rollup_table if read_rollup else None,
+    )
+    demographics_sql, event_diversity_sql = build_mission_queries(
+        members_table=members_table,
+        events_table=events_table,
+        attendance_table=attendance_table,
+        event_stats_table=event_stats_table,
+        is_filtered=is_filtered,
+        by_semester_key=semester_key is not None,
+    )
+
+    # Each section is aggregated into one JSON column. json_agg sorts its input with
+    # the same keys as the section's standalone query, since the subquery's ORDER BY
+    # does not carry over to the aggregate.
+    meta_column_sql = (
+        f"(SELECT row_to_json(t) FROM ({meta_sql}) t) AS overview_meta"
+        if meta_sql is not None
+        else "NULL::json AS overview_meta"
+    )
+
+    combined_sql = f"""
+    WITH {per_person_ctes}
+    SELECT
+        (SELECT row_to_json(t) FROM ({kpis_sql}) t) AS overview_kpis,
+        (SELECT COALESCE(json_agg(t ORDER BY t.period), '[]'::json) FROM ({time_series_sql}) t) AS overview_time_series,
+        {meta_column_sql},
+        (SELECT COALESCE(json_agg(t ORDER BY t.events_attended_bucket), '[]'::json) FROM ({overall_select}) t) AS retention_overall,
+        (SELECT COALESCE(json_agg(t ORDER BY t.major_category, t.events_attended_bucket), '[]'::json) FROM ({by_major_select}) t) AS retention_by_major,
+        (SELECT COALESCE(json_agg(t ORDER BY t.dimension, t.position), '[]'::json) FROM ({demographics_sql}) t) AS mission_demographics;
+    """
+
+    params = (
+        {
+            "semester_start": semester_start,
+            "semester_end": semester_end,
+            "semester_key": semester_key,
+        }
+        if is_filtered
+        else None
+    )
+
+    with conn.cursor() as cur:
+        with named_query("dashboard.combined"):
+            if params:
+                cur.execute(combined_sql, params)
+            else:
+                cur.execute(combined_sql)
+        combined_row = cur.fetchone()
+
+        with named_query("dashboard.event_diversity"):
+            cur.execute(event_diversity_sql, {**(params or {}), "top_events": top_events})
+        event_rows = cur.fetchall()
+
+    if is_filtered:
+        meta_start = semester_start.isoformat()
+        meta_end = (semester_end - timedelta(days=1)).isoformat()
+    else:
+        # json dates arrive as ISO strings already
+        meta_row = combined_row["overview_meta"] or {}
+        meta_start = meta_row.get("start_date")
+        meta_end = meta_row.get("end_date")
+
+    with timed_phase("dashboard.shape"):
+        overview = shape_overview_payload(
+            combined_row["overview_kpis"],
+            combined_row["overview_time_series"],
+            meta_start,
+            meta_end,
+        )
+        retention = shape_retention_payload(
+            combined_row["retention_overall"],
+            combined_row["retention_by_major"],
+        )
+        mission = shape_mission_payload(
+            combined_row["mission_demographics"],
+            event_rows,
+        )
+
+    payload = {
+        "overview": overview,
+        "retention": retention,
+        "mission": mission,
+    }
+    if use_snapshot:
+        for section in payload.values():
+            with_snapshot_age(section, None)
+    return payload
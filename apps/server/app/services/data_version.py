@@ -0,0 +1,84 @@
+"""
+Cheap version stamp for the data behind the analytics payloads.
+
+Imports add an event (with its attendance) and then recompute active members and
+the attendance rollup, so the newest event, the event and member counts, the
+active-member count and the rollup's last refresh together change whenever an
+analytics payload can. The current date is part of the version as well, because
+the unfiltered window and the 30-day growth KPI end today.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import date, datetime, time, timezone
+from typing import NamedTuple, Optional
+
+from psycopg2.extensions import connection as Connection
+
+
+class DataVersion(NamedTuple):
+    events_changed_at: Optional[datetime]
+    events: int
+    members: int
+    active_members: int
+    rollup_changed_at: Optional[datetime]
+    day: date
+
+    @property
+    def last_modified(self) -> datetime:
+        """Newest change, never earlier than the start of the current day (UTC)."""
+        start_of_day = datetime.combine(self.day, time.min, tzinfo=timezone.utc)
+        changes = [start_of_day, self.events_changed_at, self.rollup_changed_at]
+        return max(changed for changed in changes if changed is not None)
+
+    def etag(self, *parts: object) -> str:
+        """Weak ETag for this version plus the request-specific parts (endpoint, semester, format)."""
+        digest = hashlib.sha1(repr((tuple(self), parts)).encode("utf-8")).hexdigest()[:20]
+        return f'W/"{digest}"'
+
+
+def fetch_data_version(
+    conn: Connection,
+    *,
+    events_table: str = "public.events",
+    members_table: str = "public.members",
+    rollup_table: Optional[str] = None,
+) -> DataVersion:
+    """
+    One round trip: MAX(created_at) uses the events(created_at) index from
+    migrations/0003 and the member counts scan the small members table.
+    """
+    rollup_sql = (
+        f"(SELECT MAX(updated_at) FROM {rollup_table})"
+        if rollup_table is not None
+        else "NULL::timestamptz"
+    )
+    sql = f"""
+    SELECT
+        (SELECT MAX(created_at) FROM {events_table}) AS events_changed_at,
+        (SELECT COUNT(*) FROM {events_table})::int AS events,
+        m.members,
+        m.active_members,
+        {rollup_sql} AS rollup_changed_at,
+        CURRENT_DATE AS day
+    FROM (
+        SELECT
+            COUNT(*)::int AS members,
+            COUNT(*) FILTER (WHERE is_active_member = TRUE)::int AS active_members
+        FROM {members_table}
+    ) m;
+    """
+
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        row = cur.fetchone()
+
+    return DataVersion(
+        events_changed_at=row["events_changed_at"],
+        events=row["events"],
+        members=row["members"],
+        active_members=row["active_members"],
+        rollup_changed_at=row["rollup_changed_at"],
+        day=row["day"],
+    )
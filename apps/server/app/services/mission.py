@@ -11,26 +11,34 @@ from datetime import date
 
 from psycopg2.extensions import connection as Connection
 
+from app.query_metrics import named_query
+from app.server_timing import timed_phase
+from app.services.semester import event_window_sql, semester_key_for_window
+from app.services.snapshot import read_snapshot, with_snapshot_age
 
-def build_mission_payload(
-    conn: Connection,
+# Events in the diversity chart; snapshots are computed with the default
+DEFAULT_TOP_EVENTS = 10
+MAX_TOP_EVENTS = 50
+
+
+def build_mission_queries(
     *,
     members_table: str = "public.members",
     events_table: str = "public.events",
     attendance_table: str = "public.event_attendance",
-    semester_start: date | None = None,
-    semester_end: date | None = None,
-):
+    event_stats_table: str = "public.event_stats",
+    is_filtered: bool = False,
+    by_semester_key: bool = False,
+) -> tuple[str, str]:
     """
-    Mission analytics: member demographics + event diversity
+    Returns (demographics_sql, event_diversity_sql) as bare SELECT statements.
 
-    If semester_start and semester_end are provided, demographic distributions are
-    scoped to members who attended at least one event in that semester and event
-    diversity is restricted to semester events.
+    demographics_sql yields (dimension, label, members, position) rows for both the
+    major category and class year distributions. Filtered queries expect
+    %(semester_start)s / %(semester_end)s, or %(semester_key)s with by_semester_key
+    (see event_window_sql), and event_diversity_sql always expects %(top_events)s.
     """
 
-    is_filtered = semester_start is not None and semester_end is not None
-
     norm_major_category_sql = """
         COALESCE(
           NULLIF(
@@ -46,165 +54,134 @@ def build_mission_payload(
 
     norm_class_year_sql = "COALESCE(NULLIF(TRIM(class_year), ''), 'Other/Unknown')"
 
+    event_window = event_window_sql("e", by_semester_key)
+
     if is_filtered:
-        major_dist_sql = f"""
-        SELECT
-            {norm_major_category_sql} AS major_category,
-            COUNT(*)::int AS members
-        FROM {members_table} m
-        WHERE EXISTS (
-            SELECT 1
+        # Collect the semester's normalized attendee and member emails (stored columns
+        # from migrations/0004), then equi-join members on email_normalized so its
+        # index applies instead of a per-member attendance scan.
+        demographic_members_sql = f"""
+        semester_emails AS (
+            SELECT a.attendee_email_normalized AS email
             FROM {attendance_table} a
             JOIN {events_table} e ON e.id = a.event_id
-            WHERE e.starts_at >= %(semester_start)s
-              AND e.starts_at < %(semester_end)s
-              AND (
-                (a.member_email IS NOT NULL AND LOWER(TRIM(a.member_email)) = LOWER(TRIM(m.email)))
-                OR (a.attendee_email IS NOT NULL AND LOWER(TRIM(a.attendee_email)) = LOWER(TRIM(m.email)))
-              )
-        )
-        GROUP BY 1
-        ORDER BY members DESC;
-        """
+            WHERE {event_window}
+              AND a.attendee_email_normalized IS NOT NULL
 
-        class_year_sql = f"""
-        WITH grouped_class_year AS (
-            SELECT
-                {norm_class_year_sql} AS class_year,
-                COUNT(*)::int AS members
+            UNION
+
+            SELECT a.member_email_normalized AS email
+            FROM {attendance_table} a
+            JOIN {events_table} e ON e.id = a.event_id
+            WHERE {event_window}
+              AND a.member_email_normalized IS NOT NULL
+        ),
+        demographic_members AS (
+            SELECT m.major_category, m.class_year
             FROM {members_table} m
-            WHERE EXISTS (
-                SELECT 1
-                FROM {attendance_table} a
-                JOIN {events_table} e ON e.id = a.event_id
-                WHERE e.starts_at >= %(semester_start)s
-                  AND e.starts_at < %(semester_end)s
-                  AND (
-                    (a.member_email IS NOT NULL AND LOWER(TRIM(a.member_email)) = LOWER(TRIM(m.email)))
-                    OR (a.attendee_email IS NOT NULL AND LOWER(TRIM(a.attendee_email)) = LOWER(TRIM(m.email)))
-                  )
-            )
-            GROUP BY 1
+            JOIN semester_emails se ON m.email_normalized = se.email
         )
-        SELECT class_year, members
-        FROM grouped_class_year
-        ORDER BY
-            CASE class_year
-                WHEN 'Freshman' THEN 1
-                WHEN 'Sophomore' THEN 2
-                WHEN 'Junior' THEN 3
-                WHEN 'Senior' THEN 4
-                WHEN 'Grad' THEN 5
-                ELSE 6
-            END,
-            class_year;
         """
-
-        event_filter_clause = "WHERE e.starts_at >= %(semester_start)s AND e.starts_at < %(semester_end)s"
-        params = {
-            "semester_start": semester_start,
-            "semester_end": semester_end,
-        }
     else:
-        major_dist_sql = f"""
-        SELECT
-            {norm_major_category_sql} AS major_category,
-            COUNT(*)::int AS members
-        FROM {members_table}
-        GROUP BY 1
-        ORDER BY members DESC;
-        """
-
-        class_year_sql = f"""
-        WITH grouped_class_year AS (
-            SELECT
-                {norm_class_year_sql} AS class_year,
-                COUNT(*)::int AS members
+        demographic_members_sql = f"""
+        demographic_members AS (
+            SELECT major_category, class_year
             FROM {members_table}
-            GROUP BY 1
         )
-        SELECT class_year, members
-        FROM grouped_class_year
-        ORDER BY
-            CASE class_year
-                WHEN 'Freshman' THEN 1
-                WHEN 'Sophomore' THEN 2
-                WHEN 'Junior' THEN 3
-                WHEN 'Senior' THEN 4
-                WHEN 'Grad' THEN 5
-                ELSE 6
-            END,
-            class_year;
         """
 
-        event_filter_clause = ""
-        params = None
-
-    event_diversity_sql = f"""
-    WITH event_attendance_counts AS (
+    # Both distributions come from the same member set in one statement; `position`
+    # carries each distribution's display order.
+    demographics_sql = f"""
+    WITH {demographic_members_sql},
+    major_distribution AS (
         SELECT
-            e.id AS event_id,
-            e.title AS event_title,
-            e.starts_at,
-            COUNT(DISTINCT a.attendee_email)::int AS total_attendees
-        FROM {events_table} e
-        LEFT JOIN {attendance_table} a ON e.id = a.event_id
-        {event_filter_clause}
-        GROUP BY e.id, e.title, e.starts_at
-        HAVING COUNT(DISTINCT a.attendee_email) > 0
-        ORDER BY total_attendees DESC
-        LIMIT 10
+            {norm_major_category_sql} AS label,
+            COUNT(*)::int AS members
+        FROM demographic_members
+        GROUP BY 1
     ),
-    event_major_breakdown AS (
+    class_year_distribution AS (
         SELECT
-            a.event_id,
-            COALESCE(
-              NULLIF(
-                CASE
-                    WHEN COALESCE(m.major_category, a.attendee_major_category) = 'Unknown/other' THEN 'Other/Unknown'
-                    ELSE COALESCE(m.major_category, a.attendee_major_category)
-                END,
-                ''
-              ),
-              'Other/Unknown'
-            ) AS major_category,
-            COUNT(DISTINCT a.attendee_email)::int AS count
-        FROM {attendance_table} a
-        LEFT JOIN {members_table} m ON a.member_email = m.email
-        WHERE a.event_id IN (SELECT event_id FROM event_attendance_counts)
-        GROUP BY a.event_id, 2
+            {norm_class_year_sql} AS label,
+            COUNT(*)::int AS members
+        FROM demographic_members
+        GROUP BY 1
     )
     SELECT
-        eac.event_id,
-        eac.event_title,
-        eac.starts_at,
-        eac.total_attendees,
-        emb.major_category,
-        emb.count,
-        ROUND(emb.count::numeric / NULLIF(eac.total_attendees, 0), 4) AS pct
-    FROM event_attendance_counts eac
-    JOIN event_major_breakdown emb ON eac.event_id = emb.event_id
-    ORDER BY eac.total_attendees DESC, emb.count DESC;
+        'major_category' AS dimension,
+        label,
+        members,
+        ROW_NUMBER() OVER (ORDER BY members DESC) AS position
+    FROM major_distribution
+
+    UNION ALL
+
+    SELECT
+        'class_year' AS dimension,
+        label,
+        members,
+        ROW_NUMBER() OVER (
+            ORDER BY
+                CASE label
+                    WHEN 'Freshman' THEN 1
+                    WHEN 'Sophomore' THEN 2
+                    WHEN 'Junior' THEN 3
+                    WHEN 'Senior' THEN 4
+                    WHEN 'Grad' THEN 5
+                    ELSE 6
+                END,
+                label
+        ) AS position
+    FROM class_year_distribution
+    ORDER BY dimension, position
     """
 
-    with conn.cursor() as cur:
-        if params:
-            cur.execute(major_dist_sql, params)
-        else:
-            cur.execute(major_dist_sql)
-        major_dist = cur.fetchall()
+    # Top events by distinct attendees from public.event_stats (migrations/0005),
+    # which the import keeps current; unfiltered reads walk its total_attendees index.
+    if is_filtered:
+        top_events_sql = f"""
+        SELECT s.event_id, s.total_attendees, s.major_category_counts
+        FROM {event_stats_table} s
+        JOIN {events_table} e ON e.id = s.event_id
+        WHERE {event_window}
+        ORDER BY s.total_attendees DESC, s.event_id
+        LIMIT %(top_events)s
+        """
+    else:
+        top_events_sql = f"""
+        SELECT event_id, total_attendees, major_category_counts
+        FROM {event_stats_table}
+        ORDER BY total_attendees DESC, event_id
+        LIMIT %(top_events)s
+        """
 
-        if params:
-            cur.execute(class_year_sql, params)
-        else:
-            cur.execute(class_year_sql)
-        class_year_dist = cur.fetchall()
+    event_diversity_sql = f"""
+    SELECT
+        t.event_id,
+        e.title AS event_title,
+        e.starts_at,
+        t.total_attendees,
+        c.major_category,
+        c.count::int AS count,
+        ROUND(c.count::numeric / NULLIF(t.total_attendees, 0), 4) AS pct
+    FROM ({top_events_sql}) t
+    JOIN {events_table} e ON e.id = t.event_id
+    CROSS JOIN LATERAL jsonb_each_text(t.major_category_counts) AS c(major_category, count)
+    ORDER BY t.total_attendees DESC, t.event_id, c.count::int DESC, c.major_category
+    """
+
+    return demographics_sql, event_diversity_sql
 
-        if params:
-            cur.execute(event_diversity_sql, params)
+
+def shape_mission_payload(demographic_rows, event_rows):
+    major_dist = []
+    class_year_dist = []
+    for row in sorted(demographic_rows, key=lambda r: r["position"]):
+        if row["dimension"] == "major_category":
+            major_dist.append({"major_category": row["label"], "members": row["members"]})
         else:
-            cur.execute(event_diversity_sql)
-        event_rows = cur.fetchall()
+            class_year_dist.append({"class_year": row["label"], "members": row["members"]})
 
     events_dict = {}
     for row in event_rows:
@@ -229,14 +206,77 @@ def build_mission_payload(
 
     return {
         "mission": {
-            "major_category_distribution": [
-                {"major_category": row["major_category"], "members": row["members"]}
-                for row in major_dist
-            ],
-            "class_year_distribution": [
-                {"class_year": row["class_year"], "members": row["members"]}
-                for row in class_year_dist
-            ],
+            "major_category_distribution": major_dist,
+            "class_year_distribution": class_year_dist,
             "event_major_category_percent": list(events_dict.values()),
         }
     }
+
+
+def build_mission_payload(
+    conn: Connection,
+    *,
+    members_table: str = "public.members",
+    events_table: str = "public.events",
+    attendance_table: str = "public.event_attendance",
+    event_stats_table: str = "public.event_stats",
+    semester_start: date | None = None,
+    semester_end: date | None = None,
+    top_events: int = DEFAULT_TOP_EVENTS,
+    use_snapshot: bool = False,
+):
+    """
+    Mission analytics: member demographics + event diversity
+
+    If semester_start and semester_end are provided, demographic distributions are
+    scoped to members who attended at least one event in that semester and event
+    diversity is restricted to semester events. Event diversity covers the
+    top_events events with the most distinct attendees.
+
+    With use_snapshot, a fresh precomputed snapshot is returned when one exists and
+    meta.snapshot_age_seconds reports its age (None when computed live). Snapshots
+    hold DEFAULT_TOP_EVENTS events, so other sizes are always computed live.
+    """
+
+    if use_snapshot and top_events == DEFAULT_TOP_EVENTS:
+        snapshot = read_snapshot(conn, "mission", semester_start, semester_end)
+        if snapshot is not None:
+            return with_snapshot_age(*snapshot)
+
+    is_filtered = semester_start is not None and semester_end is not None
+    semester_key = semester_key_for_window(semester_start, semester_end)
+
+    demographics_sql, event_diversity_sql = build_mission_queries(
+        members_table=members_table,
+        events_table=events_table,
+        attendance_table=attendance_table,
+        event_stats_table=event_stats_table,
+        is_filtered=is_filtered,
+        by_semester_key=semester_key is not None,
+    )
+
+    params = (
+        {
+            "semester_start": semester_start,
+            "semester_end": semester_end,
+            "semester_key": semester_key,
+        }
+        if is_filtered
+        else None
+    )
+
+    with conn.cursor() as cur:
+        with named_query("mission.demographics"):
+            if params:
+                cur.execute(demographics_sql, params)
+            else:
+                cur.execute(demographics_sql)
+        demographic_rows = cur.fetchall()
+
+        with named_query("mission.event_diversity"):
+            cur.execute(event_diversity_sql, {**(params or {}), "top_events": top_events})
+        event_rows = cur.fetchall()
+
+    with timed_phase("mission.shape"):
+        payload = shape_mission_payload(demographic_rows, event_rows)
+    return with_snapshot_age(payload, None) if use_snapshot else payload
@@ -10,31 +10,77 @@ from datetime import date, timedelta
 
 from psycopg2.extensions import connection as Connection
 
+from app.query_metrics import named_query
+from app.server_timing import timed_phase
+from app.services.snapshot import read_snapshot, with_snapshot_age
 
-def build_overview_payload(
-    conn: Connection,
+
+def _time_series_sql(
+    members_table: str,
     *,
-    members_table: str = "public.members",
-    attendance_table: str = "public.event_attendance",
-    semester_start: date | None = None,
-    semester_end: date | None = None,
-):
+    months_sql: str,
+    joined_filter_sql: str,
+    active_filter_sql: str,
+) -> str:
     """
-    Build overview analytics payload for the dashboard.
+    Monthly cumulative registered/active member counts in a single pass.
 
-    Returns a payload with:
-    - Total members count
-    - Active members count and percentage
-    - Growth rate
-    - Monthly time-series of cumulative member counts
+    Members are bucketed by month once, then a running SUM() over the gap-filled
+    month series yields each cumulative value, instead of recounting the members
+    table for every month. Counts that predate the first month are folded into it.
+    """
 
-    If semester_start and semester_end are provided, calculations are scoped to
-    that date window [semester_start, semester_end).
+    return f"""
+    WITH months AS (
+        SELECT month_start
+        FROM {months_sql} AS month_start
+    ),
+    first_month AS (
+        SELECT MIN(month_start) AS month_start
+        FROM months
+    ),
+    registered_by_month AS (
+        SELECT
+            GREATEST(DATE_TRUNC('month', joined_at), fm.month_start) AS month_start,
+            COUNT(*)::int AS members
+        FROM {members_table}, first_month fm
+        WHERE joined_at IS NOT NULL
+          {joined_filter_sql}
+        GROUP BY 1
+    ),
+    activated_by_month AS (
+        SELECT
+            GREATEST(DATE_TRUNC('month', active_member_start_date), fm.month_start) AS month_start,
+            COUNT(*)::int AS members
+        FROM {members_table}, first_month fm
+        WHERE is_active_member = TRUE
+          AND active_member_start_date IS NOT NULL
+          {active_filter_sql}
+        GROUP BY 1
+    )
+    SELECT
+        TO_CHAR(m.month_start, 'YYYY-MM') AS period,
+        (SUM(COALESCE(r.members, 0)) OVER running)::int AS registered_members_cumulative,
+        (SUM(COALESCE(a.members, 0)) OVER running)::int AS active_members_cumulative
+    FROM months m
+    LEFT JOIN registered_by_month r ON r.month_start = m.month_start
+    LEFT JOIN activated_by_month a ON a.month_start = m.month_start
+    WINDOW running AS (ORDER BY m.month_start)
+    ORDER BY m.month_start
     """
 
-    _ = attendance_table  # kept for compatibility with existing function signature
 
-    is_filtered = semester_start is not None and semester_end is not None
+def build_overview_queries(
+    *,
+    members_table: str = "public.members",
+    is_filtered: bool = False,
+) -> tuple[str, str, str | None]:
+    """
+    Returns (kpis_sql, time_series_sql, meta_sql) as bare SELECT statements.
+
+    Filtered queries expect %(semester_start)s / %(semester_end)s parameters.
+    meta_sql is None when filtered, since the window bounds come from the caller.
+    """
 
     if is_filtered:
         kpis_sql = f"""
@@ -68,43 +114,26 @@ def build_overview_payload(
                 WHEN g.previous_30d = 0 THEN 0.0
                 ELSE ROUND(100.0 * (g.recent_30d - g.previous_30d) / g.previous_30d, 1)
             END AS registered_growth_last_30d_pct
-        FROM stats s, growth g;
+        FROM stats s, growth g
         """
 
-        time_series_sql = f"""
-        SELECT
-            TO_CHAR(date_series, 'YYYY-MM') AS period,
-            (
-                SELECT COUNT(*)::int
-                FROM {members_table}
-                WHERE joined_at >= %(semester_start)s
-                  AND joined_at < %(semester_end)s
-                  AND joined_at < (date_series + INTERVAL '1 month')
-            ) AS registered_members_cumulative,
-            (
-                SELECT COUNT(*)::int
-                FROM {members_table}
-                WHERE is_active_member = TRUE
-                  AND active_member_start_date IS NOT NULL
-                  AND active_member_start_date >= %(semester_start)s
-                  AND active_member_start_date < %(semester_end)s
-                  AND active_member_start_date < (date_series + INTERVAL '1 month')
-            ) AS active_members_cumulative
-        FROM generate_series(
-            DATE_TRUNC('month', %(semester_start)s::date),
-            DATE_TRUNC('month', (%(semester_end)s::date - INTERVAL '1 day')),
-            INTERVAL '1 month'
-        ) AS date_series
-        ORDER BY date_series;
-        """
-
-        params = {
-            "semester_start": semester_start,
-            "semester_end": semester_end,
-        }
+        time_series_sql = _time_series_sql(
+            members_table,
+            months_sql="""
+            generate_series(
+                DATE_TRUNC('month', %(semester_start)s::date),
+                DATE_TRUNC('month', (%(semester_end)s::date - INTERVAL '1 day')),
+                INTERVAL '1 month'
+            )
+            """,
+            joined_filter_sql="AND joined_at >= %(semester_start)s AND joined_at < %(semester_end)s",
+            active_filter_sql=(
+                "AND active_member_start_date >= %(semester_start)s "
+                "AND active_member_start_date < %(semester_end)s"
+            ),
+        )
 
-        meta_start = semester_start.isoformat()
-        meta_end = (semester_end - timedelta(days=1)).isoformat()
+        meta_sql = None
     else:
         kpis_sql = f"""
         WITH stats AS (
@@ -124,67 +153,33 @@ def build_overview_payload(
             s.active_members,
             ROUND(100.0 * s.active_members / NULLIF(s.total_members, 0), 1) AS active_members_pct,
             CASE WHEN g.previous_30d = 0 THEN 0.0 ELSE ROUND(100.0 * (g.recent_30d - g.previous_30d) / g.previous_30d, 1) END AS registered_growth_last_30d_pct
-        FROM stats s, growth g;
+        FROM stats s, growth g
         """
 
-        time_series_sql = f"""
+        time_series_sql = _time_series_sql(
+            members_table,
+            months_sql=f"""
+            generate_series(
+                (SELECT DATE_TRUNC('month', MIN(joined_at)) FROM {members_table}),
+                DATE_TRUNC('month', CURRENT_DATE),
+                INTERVAL '1 month'
+            )
+            """,
+            joined_filter_sql="",
+            active_filter_sql="",
+        )
+
+        meta_sql = f"""
         SELECT
-            TO_CHAR(date_series, 'YYYY-MM') AS period,
-            (
-                SELECT COUNT(*)::int
-                FROM {members_table}
-                WHERE joined_at < (date_series + INTERVAL '1 month')
-            ) AS registered_members_cumulative,
-            (
-                SELECT COUNT(*)::int
-                FROM {members_table}
-                WHERE is_active_member = TRUE
-                  AND active_member_start_date IS NOT NULL
-                  AND active_member_start_date < (date_series + INTERVAL '1 month')
-            ) AS active_members_cumulative
-        FROM generate_series((SELECT DATE_TRUNC('month', MIN(joined_at)) FROM {members_table}), DATE_TRUNC('month', CURRENT_DATE), INTERVAL '1 month') AS date_series
-        ORDER BY date_series;
+            DATE(MIN(joined_at)) AS start_date,
+            CURRENT_DATE::date AS end_date
+        FROM {members_table}
         """
 
-        params = None
-        meta_start = None
-        meta_end = None
-
-    with conn.cursor() as cur:
-        if params:
-            cur.execute(kpis_sql, params)
-        else:
-            cur.execute(kpis_sql)
-        kpis_row = cur.fetchone()
-
-        if params:
-            cur.execute(time_series_sql, params)
-        else:
-            cur.execute(time_series_sql)
-        time_series_rows = cur.fetchall()
+    return kpis_sql, time_series_sql, meta_sql
 
-        if not is_filtered:
-            cur.execute(
-                f"""
-                SELECT
-                    DATE(MIN(joined_at)) AS start_date,
-                    CURRENT_DATE::date AS end_date
-                FROM {members_table};
-                """
-            )
-            meta_row = cur.fetchone()
-            if meta_row:
-                meta_start = (
-                    meta_row["start_date"].isoformat()
-                    if meta_row.get("start_date") is not None
-                    else None
-                )
-                meta_end = (
-                    meta_row["end_date"].isoformat()
-                    if meta_row.get("end_date") is not None
-                    else None
-                )
 
+def shape_overview_payload(kpis_row, time_series_rows, meta_start, meta_end):
     return {
         "overview": {
             "kpis": {
@@ -211,3 +206,91 @@ def build_overview_payload(
             "end": meta_end,
         },
     }
+
+
+def build_overview_payload(
+    conn: Connection,
+    *,
+    members_table: str = "public.members",
+    attendance_table: str = "public.event_attendance",
+    semester_start: date | None = None,
+    semester_end: date | None = None,
+    use_snapshot: bool = False,
+):
+    """
+    Build overview analytics payload for the dashboard.
+
+    Returns a payload with:
+    - Total members count
+    - Active members count and percentage
+    - Growth rate
+    - Monthly time-series of cumulative member counts
+
+    If semester_start and semester_end are provided, calculations are scoped to
+    that date window [semester_start, semester_end).
+
+    With use_snapshot, a fresh precomputed snapshot is returned when one exists and
+    meta.snapshot_age_seconds reports its age (None when computed live).
+    """
+
+    _ = attendance_table  # kept for compatibility with existing function signature
+
+    if use_snapshot:
+        snapshot = read_snapshot(conn, "overview", semester_start, semester_end)
+        if snapshot is not None:
+            return with_snapshot_age(*snapshot)
+
+    is_filtered = semester_start is not None and semester_end is not None
+
+    kpis_sql, time_series_sql, meta_sql = build_overview_queries(
+        members_table=members_table,
+        is_filtered=is_filtered,
+    )
+
+    if is_filtered:
+        params = {
+            "semester_start": semester_start,
+            "semester_end": semester_end,
+        }
+
+        meta_start = semester_start.isoformat()
+        meta_end = (semester_end - timedelta(days=1)).isoformat()
+    else:
+        params = None
+        meta_start = None
+        meta_end = None
+
+    with conn.cursor() as cur:
+        with named_query("overview.kpis"):
+            if params:
+                cur.execute(kpis_sql, params)
+            else:
+                cur.execute(kpis_sql)
+        kpis_row = cur.fetchone()
+
+        with named_query("overview.time_series"):
+            if params:
+                cur.execute(time_series_sql, params)
+            else:
+                cur.execute(time_series_sql)
+        time_series_rows = cur.fetchall()
+
+        if meta_sql is not None:
+            with named_query("overview.meta"):
+                cur.execute(meta_sql)
+            meta_row = cur.fetchone()
+            if meta_row:
+                meta_start = (
+                    meta_row["start_date"].isoformat()
+                    if meta_row.get("start_date") is not None
+                    else None
+                )
+                meta_end = (
+                    meta_row["end_date"].isoformat()
+                    if meta_row.get("end_date") is not None
+                    else None
+                )
+
+    with timed_phase("overview.shape"):
+        payload = shape_overview_payload(kpis_row, time_series_rows, meta_start, meta_end)
+    return with_snapshot_age(payload, None) if use_snapshot else payload
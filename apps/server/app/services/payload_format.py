@@ -0,0 +1,131 @@
+"""
+Response formats for analytics payloads.
+
+The default "rows" format is the payload as the services shape it: lists of row
+objects. The opt-in "columnar" format turns those lists into parallel arrays (one
+array per field) and the retention by-major breakdown into a dense
+major x bucket matrix, which drops the repeated keys from every row.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Literal
+
+from fastapi.encoders import jsonable_encoder
+
+from app.services.retention import BUCKETS
+
+try:
+    import orjson
+except ModuleNotFoundError:
+    orjson = None
+
+PayloadFormat = Literal["rows", "columnar"]
+
+TIME_SERIES_FIELDS = ["period", "registered_members_cumulative", "active_members_cumulative"]
+EVENT_FIELDS = ["event_id", "event_title", "starts_at", "total_attendees"]
+SEGMENT_FIELDS = ["major_category", "pct", "count"]
+
+
+def _columns(rows: list[dict], fields: list[str]) -> dict[str, list]:
+    return {field: [row[field] for row in rows] for field in fields}
+
+
+def _overview_columnar(payload: dict) -> dict:
+    overview = payload["overview"]
+    return {
+        **payload,
+        "overview": {
+            **overview,
+            "members_over_time": _columns(overview["members_over_time"], TIME_SERIES_FIELDS),
+        },
+    }
+
+
+def _retention_columnar(payload: dict) -> dict:
+    # Buckets are always filled in BUCKETS order, so counts line up with "buckets"
+    retention = payload["retention"]
+    by_major = retention["attendance_count_distribution_by_major_category"]
+    return {
+        **payload,
+        "retention": {
+            "buckets": list(BUCKETS),
+            "attendance_count_distribution_overall": [
+                row["people"] for row in retention["attendance_count_distribution_overall"]
+            ],
+            "attendance_count_distribution_by_major_category": {
+                "major_category": [entry["major_category"] for entry in by_major],
+                "people": [[row["people"] for row in entry["distribution"]] for entry in by_major],
+            },
+        },
+    }
+
+
+def _mission_columnar(payload: dict) -> dict:
+    mission = payload["mission"]
+    events = mission["event_major_category_percent"]
+    return {
+        **payload,
+        "mission": {
+            "major_category_distribution": _columns(
+                mission["major_category_distribution"], ["major_category", "members"]
+            ),
+            "class_year_distribution": _columns(
+                mission["class_year_distribution"], ["class_year", "members"]
+            ),
+            "event_major_category_percent": {
+                **_columns(events, EVENT_FIELDS),
+                "segments": [_columns(event["segments"], SEGMENT_FIELDS) for event in events],
+            },
+        },
+    }
+
+
+_SECTION_CONVERTERS = {
+    "overview": _overview_columnar,
+    "retention": _retention_columnar,
+    "mission": _mission_columnar,
+}
+
+
+def to_columnar(endpoint: str, payload: dict) -> dict:
+    """
+    Returns the columnar form of an endpoint's payload ("overview", "retention",
+    "mission" or "dashboard"). The input is not modified; cached payloads are shared.
+    """
+    if endpoint == "dashboard":
+        return {
+            **payload,
+            **{
+                section: _SECTION_CONVERTERS[section](payload[section])
+                for section in _SECTION_CONVERTERS
+            },
+        }
+    return _SECTION_CONVERTERS[endpoint](payload)
+
+
+def encode_payload(endpoint: str, payload: dict, payload_format: PayloadFormat) -> tuple[bytes, float]:
+    """
+    Serializes a payload in the requested format and returns (body, seconds spent).
+
+    Rows are encoded exactly as FastAPI's JSONResponse would. Columnar payloads use
+    orjson when it is installed and compact json.dumps otherwise.
+    """
+    started = time.perf_counter()
+    if payload_format == "columnar":
+        columnar = to_columnar(endpoint, payload)
+        if orjson is not None:
+            body = orjson.dumps(columnar, default=jsonable_encoder)
+        else:
+            body = json.dumps(jsonable_encoder(columnar), separators=(",", ":")).encode("utf-8")
+    else:
+        body = json.dumps(
+            jsonable_encoder(payload),
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":"),
+        ).encode("utf-8")
+    return body, time.perf_counter() - started
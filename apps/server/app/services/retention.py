@@ -1,43 +1,75 @@
 from psycopg2.extensions import connection as Connection
 from datetime import date
 
+from app.query_metrics import named_query
+from app.server_timing import timed_phase
+from app.services.semester import event_window_sql, semester_key_for_window
+from app.services.snapshot import read_snapshot, with_snapshot_age
+
 BUCKETS = ["0", "1", "2", "3", "4+"]
 
 def _fill_buckets(rows):
     m = {r["events_attended_bucket"]: int(r["people"]) for r in rows}
     return [{"events_attended_bucket": b, "people": m.get(b, 0)} for b in BUCKETS]
 
-def build_retention_payload(
-    conn: Connection,
+_OVERALL_SELECT = """
+    SELECT
+      CASE WHEN events_attended >= 4 THEN '4+' ELSE events_attended::text END AS events_attended_bucket,
+      COUNT(*)::int AS people
+    FROM per_person
+    GROUP BY 1
+    """
+
+_BY_MAJOR_SELECT = """
+    SELECT
+      major_category,
+      CASE WHEN events_attended >= 4 THEN '4+' ELSE events_attended::text END AS events_attended_bucket,
+      COUNT(*)::int AS people
+    FROM per_person
+    GROUP BY major_category, events_attended_bucket
+    ORDER BY major_category, events_attended_bucket
+    """
+
+def build_retention_queries(
     *,
     members_table: str = "public.members",
     attendance_table: str = "public.event_attendance",
     members_email_col: str = "email",
+    members_email_normalized_col: str = "email_normalized",
     members_major_category_col: str = "major_category",
     attendee_email_col: str = "attendee_email",
+    attendee_email_normalized_col: str = "attendee_email_normalized",
     attendee_major_category_col: str = "attendee_major_category",
     event_id_col: str = "event_id",
     events_table: str = "public.events",
-    semester_start: date | None = None,
-    semester_end: date | None = None,
-):
-    is_filtered = semester_start is not None and semester_end is not None
+    is_filtered: bool = False,
+    by_semester_key: bool = False,
+    rollup_table: str | None = None,
+) -> tuple[str, str, str]:
+    """
+    Returns (per_person_ctes, overall_select, by_major_select).
 
-    event_join_sql = (
-        f"JOIN {events_table} e ON e.id = a.{event_id_col}"
-        if is_filtered
-        else ""
-    )
-    event_where_sql = (
-        "AND e.starts_at >= %(semester_start)s AND e.starts_at < %(semester_end)s"
-        if is_filtered
-        else ""
-    )
+    per_person_ctes defines the shared `per_person` set (one row per normalized
+    email with its major category and events attended); both selects read from it,
+    so callers can run them in one statement and materialize it once.
+
+    People are keyed by the stored normalized email columns (migrations/0004), so
+    the per-person counts read the (attendee_email_normalized, event_id) index.
+
+    With rollup_table set, attendee majors and event counts come from the member
+    attendance rollup (migrations/0002) instead of event_attendance; filtered
+    queries then expect %(semester_key)s rather than the date bounds.
 
-    overall_sql = f"""
-    WITH raw_people AS (
+    by_semester_key filters events on their stored semester_key (see
+    event_window_sql) and needs %(semester_key)s as well.
+    """
+
+    if rollup_table is not None:
+        rollup_where_sql = "WHERE r.semester_key = %(semester_key)s" if is_filtered else ""
+        per_person_ctes = f"""
+    raw_people AS (
       SELECT
-        LOWER(TRIM(m.{members_email_col})) AS email,
+        m.{members_email_normalized_col} AS email,
         COALESCE(NULLIF(TRIM(m.{members_major_category_col}), ''), 'Unknown') AS major_category,
         1 AS source_priority
       FROM {members_table} m
@@ -46,13 +78,11 @@ def build_retention_payload(
       UNION ALL
 
       SELECT
-        LOWER(TRIM(a.{attendee_email_col})) AS email,
-        COALESCE(NULLIF(TRIM(a.{attendee_major_category_col}), ''), 'Unknown') AS major_category,
+        r.email,
+        r.attendee_major_category AS major_category,
         2 AS source_priority
-      FROM {attendance_table} a
-      {event_join_sql}
-      WHERE a.{attendee_email_col} IS NOT NULL
-      {event_where_sql}
+      FROM {rollup_table} r
+      {rollup_where_sql}
     ),
     people AS (
       SELECT DISTINCT ON (email)
@@ -64,33 +94,39 @@ def build_retention_payload(
     ),
     attendance_counts AS (
       SELECT
-        LOWER(TRIM(a.{attendee_email_col})) AS email,
-        COUNT(DISTINCT a.{event_id_col}) AS events_attended
-      FROM {attendance_table} a
-      {event_join_sql}
-      WHERE a.{attendee_email_col} IS NOT NULL
-      {event_where_sql}
+        r.email,
+        SUM(r.events_attended) AS events_attended
+      FROM {rollup_table} r
+      {rollup_where_sql}
       GROUP BY 1
     ),
     per_person AS (
       SELECT
         p.email,
+        p.major_category,
         COALESCE(ac.events_attended, 0) AS events_attended
       FROM people p
       LEFT JOIN attendance_counts ac
         ON ac.email = p.email
     )
-    SELECT
-      CASE WHEN events_attended >= 4 THEN '4+' ELSE events_attended::text END AS events_attended_bucket,
-      COUNT(*)::int AS people
-    FROM per_person
-    GROUP BY 1;
     """
+        return per_person_ctes, _OVERALL_SELECT, _BY_MAJOR_SELECT
 
-    by_major_sql = f"""
-    WITH raw_people AS (
+    event_join_sql = (
+        f"JOIN {events_table} e ON e.id = a.{event_id_col}"
+        if is_filtered
+        else ""
+    )
+    event_where_sql = (
+        f"AND {event_window_sql('e', by_semester_key)}"
+        if is_filtered
+        else ""
+    )
+
+    per_person_ctes = f"""
+    raw_people AS (
       SELECT
-        LOWER(TRIM(m.{members_email_col})) AS email,
+        m.{members_email_normalized_col} AS email,
         COALESCE(NULLIF(TRIM(m.{members_major_category_col}), ''), 'Unknown') AS major_category,
         1 AS source_priority
       FROM {members_table} m
@@ -99,12 +135,12 @@ def build_retention_payload(
       UNION ALL
 
       SELECT
-        LOWER(TRIM(a.{attendee_email_col})) AS email,
+        a.{attendee_email_normalized_col} AS email,
         COALESCE(NULLIF(TRIM(a.{attendee_major_category_col}), ''), 'Unknown') AS major_category,
         2 AS source_priority
       FROM {attendance_table} a
       {event_join_sql}
-      WHERE a.{attendee_email_col} IS NOT NULL
+      WHERE a.{attendee_email_normalized_col} IS NOT NULL
       {event_where_sql}
     ),
     people AS (
@@ -117,11 +153,11 @@ def build_retention_payload(
     ),
     attendance_counts AS (
       SELECT
-        LOWER(TRIM(a.{attendee_email_col})) AS email,
+        a.{attendee_email_normalized_col} AS email,
         COUNT(DISTINCT a.{event_id_col}) AS events_attended
       FROM {attendance_table} a
       {event_join_sql}
-      WHERE a.{attendee_email_col} IS NOT NULL
+      WHERE a.{attendee_email_normalized_col} IS NOT NULL
       {event_where_sql}
       GROUP BY 1
     ),
@@ -134,35 +170,11 @@ def build_retention_payload(
       LEFT JOIN attendance_counts ac
         ON ac.email = p.email
     )
-    SELECT
-      major_category,
-      CASE WHEN events_attended >= 4 THEN '4+' ELSE events_attended::text END AS events_attended_bucket,
-      COUNT(*)::int AS people
-    FROM per_person
-    GROUP BY major_category, events_attended_bucket;
     """
 
-    with conn.cursor() as cur:
-        params = (
-            {
-                "semester_start": semester_start,
-                "semester_end": semester_end,
-            }
-            if is_filtered
-            else None
-        )
-
-        if params:
-            cur.execute(overall_sql, params)
-        else:
-            cur.execute(overall_sql)
-        overall_rows = cur.fetchall()
-        if params:
-            cur.execute(by_major_sql, params)
-        else:
-            cur.execute(by_major_sql)
-        by_major_rows = cur.fetchall()
+    return per_person_ctes, _OVERALL_SELECT, _BY_MAJOR_SELECT
 
+def shape_retention_payload(overall_rows, by_major_rows):
     overall = _fill_buckets(overall_rows)
 
     grouped = {}
@@ -182,3 +194,80 @@ def build_retention_payload(
             "attendance_count_distribution_by_major_category": by_major,
         }
     }
+
+def build_retention_payload(
+    conn: Connection,
+    *,
+    members_table: str = "public.members",
+    attendance_table: str = "public.event_attendance",
+    members_email_col: str = "email",
+    members_email_normalized_col: str = "email_normalized",
+    members_major_category_col: str = "major_category",
+    attendee_email_col: str = "attendee_email",
+    attendee_email_normalized_col: str = "attendee_email_normalized",
+    attendee_major_category_col: str = "attendee_major_category",
+    event_id_col: str = "event_id",
+    events_table: str = "public.events",
+    semester_start: date | None = None,
+    semester_end: date | None = None,
+    use_rollup: bool = False,
+    rollup_table: str = "public.member_attendance_rollup",
+    use_snapshot: bool = False,
+):
+    if use_snapshot:
+        snapshot = read_snapshot(conn, "retention", semester_start, semester_end)
+        if snapshot is not None:
+            return with_snapshot_age(*snapshot)
+
+    is_filtered = semester_start is not None and semester_end is not None
+    semester_key = semester_key_for_window(semester_start, semester_end)
+
+    # The rollup is keyed by semester, so arbitrary windows fall back to live counts
+    read_rollup = use_rollup and (not is_filtered or semester_key is not None)
+
+    per_person_ctes, overall_select, by_major_select = build_retention_queries(
+        members_table=members_table,
+        attendance_table=attendance_table,
+        members_email_col=members_email_col,
+        members_email_normalized_col=members_email_normalized_col,
+        members_major_category_col=members_major_category_col,
+        attendee_email_col=attendee_email_col,
+        attendee_email_normalized_col=attendee_email_normalized_col,
+        attendee_major_category_col=attendee_major_category_col,
+        event_id_col=event_id_col,
+        events_table=events_table,
+        is_filtered=is_filtered,
+        by_semester_key=semester_key is not None,
+        rollup_table=rollup_table if read_rollup else None,
+    )
+
+    overall_sql = f"WITH {per_person_ctes} {overall_select};"
+    by_major_sql = f"WITH {per_person_ctes} {by_major_select};"
+
+    with conn.cursor() as cur:
+        params = (
+            {
+                "semester_start": semester_start,
+                "semester_end": semester_end,
+                "semester_key": semester_key,
+            }
+            if is_filtered
+            else None
+        )
+
+        with named_query("retention.overall"):
+            if params:
+                cur.execute(overall_sql, params)
+            else:
+                cur.execute(overall_sql)
+        overall_rows = cur.fetchall()
+        with named_query("retention.by_major"):
+            if params:
+                cur.execute(by_major_sql, params)
+            else:
+                cur.execute(by_major_sql)
+        by_major_rows = cur.fetchall()
+
+    with timed_phase("retention.shape"):
+        payload = shape_retention_payload(overall_rows, by_major_rows)
+    return with_snapshot_age(payload, None) if use_snapshot else payload
@@ -8,6 +8,9 @@ Semester boundaries:
 
 from __future__ import annotations
 
+import os
+import threading
+import time
 from datetime import date
 from typing import Optional, TypedDict
 
@@ -54,32 +57,56 @@ def _semester_sort_key(value: str) -> tuple[int, int]:
     return year, term_rank
 
 
+def semester_key_for_window(
+    semester_start: Optional[date],
+    semester_end: Optional[date],
+) -> Optional[str]:
+    """Returns 'YYYY-term' when [semester_start, semester_end) is exactly one semester."""
+    if semester_start is None or semester_end is None:
+        return None
+    term_parts = _term_for_date(semester_start)
+    if term_parts is None:
+        return None
+    year, term = term_parts
+    if _bounds_for_term(year, term) != (semester_start, semester_end):
+        return None
+    return f"{year}-{term}"
+
+
+def event_window_sql(alias: str, by_semester_key: bool) -> str:
+    """
+    Predicate limiting events (aliased alias) to a filtered window. Windows that are
+    exactly one semester match the stored events.semester_key (migrations/0006) and
+    expect %(semester_key)s; other windows compare starts_at with
+    %(semester_start)s / %(semester_end)s.
+    """
+    if by_semester_key:
+        return f"{alias}.semester_key = %(semester_key)s"
+    return f"{alias}.starts_at >= %(semester_start)s AND {alias}.starts_at < %(semester_end)s"
+
+
+def _parse_semester_value(value: str) -> tuple[int, str]:
+    year_str, separator, term = value.partition("-")
+    if not separator or len(year_str) != 4 or not year_str.isdigit() or term not in ("spring", "fall"):
+        raise ValueError(f"Invalid semester '{value}'.")
+    return int(year_str), term
+
+
 def list_semester_options(
     conn: Connection,
     *,
     events_table: str = "public.events",
 ) -> list[SemesterOption]:
+    # Reads the events(semester_key) index from migrations/0006
     sql = f"""
-    SELECT DISTINCT DATE(starts_at) AS event_date
+    SELECT DISTINCT semester_key
     FROM {events_table}
-    WHERE starts_at IS NOT NULL
-    ORDER BY event_date DESC;
+    WHERE semester_key IS NOT NULL;
     """
 
     with conn.cursor() as cur:
         cur.execute(sql)
-        rows = cur.fetchall()
-
-    values = set()
-    for row in rows:
-        event_date = row["event_date"]
-        if event_date is None:
-            continue
-        term_parts = _term_for_date(event_date)
-        if term_parts is None:
-            continue
-        year, term = term_parts
-        values.add(f"{year}-{term}")
+        values = {row["semester_key"] for row in cur.fetchall()}
 
     sorted_values = sorted(values, key=_semester_sort_key, reverse=True)
 
@@ -106,23 +133,67 @@ def list_semester_options(
     return options
 
 
+# Memoized semester catalogue per events table: (expires_at, options, options_by_value).
+# Imports call invalidate_semester_catalogue(); the TTL bounds staleness across workers.
+_catalogue: dict[str, tuple[float, list[SemesterOption], dict[str, SemesterOption]]] = {}
+_catalogue_lock = threading.Lock()
+_CATALOGUE_TTL_SECONDS = float(os.getenv("SEMESTER_CATALOGUE_TTL_SECONDS", "300"))
+# Bumped by invalidate_semester_catalogue() so a scan that started before an
+# import does not store its outdated options
+_catalogue_generation = 0
+
+
+def get_semester_options(
+    conn: Connection,
+    *,
+    events_table: str = "public.events",
+) -> tuple[list[SemesterOption], dict[str, SemesterOption]]:
+    """Returns the cached (options, options_by_value), scanning events only when stale."""
+    now = time.monotonic()
+    with _catalogue_lock:
+        cached = _catalogue.get(events_table)
+        generation = _catalogue_generation
+    if cached is not None and cached[0] > now:
+        return cached[1], cached[2]
+
+    options = list_semester_options(conn, events_table=events_table)
+    by_value = {option["value"]: option for option in options}
+    with _catalogue_lock:
+        if generation == _catalogue_generation:
+            _catalogue[events_table] = (now + _CATALOGUE_TTL_SECONDS, options, by_value)
+    return options, by_value
+
+
+def invalidate_semester_catalogue() -> None:
+    global _catalogue_generation
+    with _catalogue_lock:
+        _catalogue_generation += 1
+        _catalogue.clear()
+
+
+def validate_semester(semester: Optional[str]) -> None:
+    """Raises ValueError for a malformed semester value without touching the database."""
+    if semester is None or semester == "" or semester == "all":
+        return
+    _parse_semester_value(semester)
+
+
 def resolve_semester_window(
     conn: Connection,
     semester: Optional[str],
     *,
     events_table: str = "public.events",
 ) -> tuple[Optional[date], Optional[date], list[SemesterOption]]:
-    options = list_semester_options(conn, events_table=events_table)
-
     if semester is None or semester == "" or semester == "all":
+        options, _ = get_semester_options(conn, events_table=events_table)
         return None, None, options
 
-    for option in options:
-        if option.get("value") == semester:
-            start_raw = option.get("start_date")
-            end_raw = option.get("end_date")
-            if not start_raw or not end_raw:
-                raise ValueError(f"Semester '{semester}' is missing date bounds.")
-            return date.fromisoformat(start_raw), date.fromisoformat(end_raw), options
+    # Malformed values are rejected before touching the database
+    year, term = _parse_semester_value(semester)
+
+    options, by_value = get_semester_options(conn, events_table=events_table)
+    if semester not in by_value:
+        raise ValueError(f"Invalid semester '{semester}'.")
 
-    raise ValueError(f"Invalid semester '{semester}'.")
+    start_date, end_date = _bounds_for_term(year, term)
+    return start_date, end_date, options
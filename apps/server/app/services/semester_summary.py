@@ -0,0 +1,143 @@
+"""
+Per-semester summary analytics for every semester at once.
+
+Aggregates events and attendance with one GROUP BY semester_key over the stored
+events.semester_key (migrations/0006) instead of one filtered request per
+semester. Each semester's attendance distribution matches the overall retention
+distribution build_retention_payload returns for that semester's window.
+"""
+
+from __future__ import annotations
+
+from psycopg2.extensions import connection as Connection
+
+from app.query_metrics import named_query
+from app.server_timing import timed_phase
+from app.services.retention import BUCKETS
+from app.services.semester import _bounds_for_term, _parse_semester_value, _semester_label, _semester_sort_key
+
+
+def build_semester_summary_query(
+    *,
+    members_table: str = "public.members",
+    events_table: str = "public.events",
+    attendance_table: str = "public.event_attendance",
+) -> str:
+    """
+    Returns one row per semester with events: attendance rows, distinct attendees
+    (and how many are members) and attendees per events-attended bucket. Members
+    with no attendance that semester make up the "0" bucket, as in retention.
+    """
+
+    return f"""
+    WITH member_emails AS (
+        SELECT DISTINCT email_normalized AS email
+        FROM {members_table}
+        WHERE email IS NOT NULL
+          AND email_normalized <> ''
+    ),
+    attendance_counts AS (
+        SELECT
+            e.semester_key,
+            a.attendee_email_normalized AS email,
+            COUNT(*) AS attendance_rows,
+            COUNT(DISTINCT a.event_id) AS events_attended
+        FROM {attendance_table} a
+        JOIN {events_table} e ON e.id = a.event_id
+        WHERE e.semester_key IS NOT NULL
+          AND a.attendee_email_normalized <> ''
+        GROUP BY 1, 2
+    ),
+    per_semester AS (
+        SELECT
+            ac.semester_key,
+            SUM(ac.attendance_rows)::int AS attendance,
+            COUNT(*)::int AS attendees,
+            COUNT(me.email)::int AS member_attendees,
+            COUNT(*) FILTER (WHERE ac.events_attended = 1)::int AS attended_1,
+            COUNT(*) FILTER (WHERE ac.events_attended = 2)::int AS attended_2,
+            COUNT(*) FILTER (WHERE ac.events_attended = 3)::int AS attended_3,
+            COUNT(*) FILTER (WHERE ac.events_attended >= 4)::int AS attended_4_plus
+        FROM attendance_counts ac
+        LEFT JOIN member_emails me ON me.email = ac.email
+        GROUP BY 1
+    ),
+    event_counts AS (
+        SELECT semester_key, COUNT(*)::int AS events
+        FROM {events_table}
+        WHERE semester_key IS NOT NULL
+        GROUP BY 1
+    )
+    SELECT
+        ec.semester_key,
+        ec.events,
+        COALESCE(ps.attendance, 0) AS attendance,
+        COALESCE(ps.attendees, 0) AS attendees,
+        COALESCE(ps.member_attendees, 0) AS member_attendees,
+        (SELECT COUNT(*) FROM member_emails)::int - COALESCE(ps.member_attendees, 0) AS attended_0,
+        COALESCE(ps.attended_1, 0) AS attended_1,
+        COALESCE(ps.attended_2, 0) AS attended_2,
+        COALESCE(ps.attended_3, 0) AS attended_3,
+        COALESCE(ps.attended_4_plus, 0) AS attended_4_plus
+    FROM event_counts ec
+    LEFT JOIN per_semester ps ON ps.semester_key = ec.semester_key
+    """
+
+
+def shape_semester_summary_payload(rows):
+    semesters = []
+    for row in sorted(rows, key=lambda r: _semester_sort_key(r["semester_key"]), reverse=True):
+        year, term = _parse_semester_value(row["semester_key"])
+        start_date, end_date = _bounds_for_term(year, term)
+        bucket_counts = [
+            row["attended_0"],
+            row["attended_1"],
+            row["attended_2"],
+            row["attended_3"],
+            row["attended_4_plus"],
+        ]
+        semesters.append(
+            {
+                "semester": row["semester_key"],
+                "label": _semester_label(year, term),
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "events": row["events"],
+                "attendance": row["attendance"],
+                "attendees": row["attendees"],
+                "member_attendees": row["member_attendees"],
+                "attendance_count_distribution_overall": [
+                    {"events_attended_bucket": bucket, "people": people}
+                    for bucket, people in zip(BUCKETS, bucket_counts)
+                ],
+            }
+        )
+
+    return {"semesters": semesters}
+
+
+def build_semester_summary_payload(
+    conn: Connection,
+    *,
+    members_table: str = "public.members",
+    events_table: str = "public.events",
+    attendance_table: str = "public.event_attendance",
+):
+    """
+    Summary of every semester, newest first: event count, attendance rows, distinct
+    attendees, member attendees and the events-attended distribution.
+    """
+
+    sql = build_semester_summary_query(
+        members_table=members_table,
+        events_table=events_table,
+        attendance_table=attendance_table,
+    )
+
+    with conn.cursor() as cur:
+        with named_query("semester_summary.by_semester"):
+            cur.execute(sql)
+        rows = cur.fetchall()
+
+    with timed_phase("semester_summary.shape"):
+        return shape_semester_summary_payload(rows)
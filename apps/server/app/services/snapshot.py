@@ -0,0 +1,125 @@
+"""
+Storage for precomputed analytics snapshots (migrations/0003).
+
+Snapshots hold the overview, retention and mission payloads for "all" and every
+semester. A snapshot is fresh when it was computed at the current data version
+(migrations/0007) and is younger than the configured max age; otherwise callers
+fall back to live queries. The data version only sees member counts, so edits to
+existing members (a changed major, say) reach snapshots within the max age.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import date
+from typing import Any, Optional
+
+from psycopg2.extensions import connection as Connection
+from psycopg2.extras import Json
+
+from app.services.data_version import fetch_data_version
+from app.services.semester import semester_key_for_window
+
+SNAPSHOTS_ENABLED = os.getenv("ANALYTICS_USE_SNAPSHOTS", "").strip().lower() in {"1", "true", "yes"}
+SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS", "900"))
+
+
+def snapshot_key_for_window(
+    semester_start: Optional[date],
+    semester_end: Optional[date],
+) -> Optional[str]:
+    """'all' for the unfiltered view, 'YYYY-term' for a semester, None otherwise."""
+    if semester_start is None and semester_end is None:
+        return "all"
+    return semester_key_for_window(semester_start, semester_end)
+
+
+def read_snapshots(
+    conn: Connection,
+    endpoints: list[str],
+    semester_key: str,
+    *,
+    max_age: float = SNAPSHOT_MAX_AGE_SECONDS,
+    snapshots_table: str = "public.analytics_snapshots",
+    events_table: str = "public.events",
+    members_table: str = "public.members",
+) -> dict[str, tuple[Any, float]]:
+    """Returns {endpoint: (payload, age_seconds)} for the fresh snapshots only."""
+    data_version = fetch_data_version(conn, events_table=events_table, members_table=members_table).etag()
+    sql = f"""
+    SELECT
+        s.endpoint,
+        s.payload,
+        EXTRACT(EPOCH FROM (now() - s.refreshed_at))::float AS age_seconds
+    FROM {snapshots_table} s
+    WHERE s.endpoint = ANY(%(endpoints)s)
+      AND s.semester_key = %(semester_key)s
+      AND s.refreshed_at > now() - make_interval(secs => %(max_age)s)
+      AND s.data_version = %(data_version)s;
+    """
+
+    with conn.cursor() as cur:
+        cur.execute(
+            sql,
+            {
+                "endpoints": endpoints,
+                "semester_key": semester_key,
+                "max_age": max_age,
+                "data_version": data_version,
+            },
+        )
+        rows = cur.fetchall()
+
+    return {row["endpoint"]: (row["payload"], round(row["age_seconds"], 1)) for row in rows}
+
+
+def write_snapshots(
+    conn: Connection,
+    snapshots: list[tuple[str, str, Any]],
+    data_version: str,
+    *,
+    snapshots_table: str = "public.analytics_snapshots",
+) -> None:
+    """
+    Upserts (endpoint, semester_key, payload) rows stamped with the data version
+    they were computed at; the caller owns the transaction.
+    """
+    sql = f"""
+    INSERT INTO {snapshots_table} (endpoint, semester_key, payload, data_version, refreshed_at)
+    VALUES (%(endpoint)s, %(semester_key)s, %(payload)s, %(data_version)s, now())
+    ON CONFLICT (endpoint, semester_key) DO UPDATE
+    SET payload = EXCLUDED.payload,
+        data_version = EXCLUDED.data_version,
+        refreshed_at = EXCLUDED.refreshed_at;
+    """
+
+    with conn.cursor() as cur:
+        for endpoint, semester_key, payload in snapshots:
+            cur.execute(
+                sql,
+                {
+                    "endpoint": endpoint,
+                    "semester_key": semester_key,
+                    "payload": Json(payload),
+                    "data_version": data_version,
+                },
+            )
+
+
+def read_snapshot(
+    conn: Connection,
+    endpoint: str,
+    semester_start: Optional[date],
+    semester_end: Optional[date],
+) -> Optional[tuple[Any, float]]:
+    """Returns (payload, age_seconds) when a fresh snapshot covers the window."""
+    semester_key = snapshot_key_for_window(semester_start, semester_end)
+    if semester_key is None:
+        return None
+    return read_snapshots(conn, [endpoint], semester_key).get(endpoint)
+
+
+def with_snapshot_age(payload: dict, age_seconds: Optional[float]) -> dict:
+    """Reports the snapshot age (None when served live) in the payload's meta."""
+    payload.setdefault("meta", {})["snapshot_age_seconds"] = age_seconds
+    return payload
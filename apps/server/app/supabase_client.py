@@ -0,0 +1,62 @@
+import logging
+import os
+import threading
+
+import httpx
+from supabase import Client, ClientOptions, create_client
+
+logger = logging.getLogger(__name__)
+
+# Idle connections to Supabase are kept open this long so back-to-back imports
+# reuse them instead of repeating the TCP/TLS handshake
+KEEPALIVE_EXPIRY_SECONDS = 60
+MAX_KEEPALIVE_CONNECTIONS = 10
+REQUEST_TIMEOUT_SECONDS = 120
+WARM_UP_TIMEOUT_SECONDS = 5
+
+_client: Client | None = None
+_http_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+
+def _get_credentials() -> tuple[str, str]:
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not key:
+        raise RuntimeError("Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY in apps/server/.env")
+    return url, key
+
+# One Supabase client per process, created on first use and shared by every import.
+# Its PostgREST calls go through a single keep-alive httpx connection pool.
+def get_supabase() -> Client:
+    global _client, _http_client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                url, key = _get_credentials()
+                _http_client = httpx.Client(
+                    timeout=REQUEST_TIMEOUT_SECONDS,
+                    limits=httpx.Limits(
+                        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+                    ),
+                )
+                _client = create_client(url, key, options=ClientOptions(httpx_client=_http_client))
+    return _client
+
+# Called on startup: builds the client and opens a connection so the first import
+# does not pay for either. Missing credentials or an unreachable project only log.
+def warm_supabase() -> None:
+    try:
+        client = get_supabase()
+        client.postgrest  # the PostgREST client is otherwise built on the first RPC
+        _http_client.head(str(client.rest_url), timeout=WARM_UP_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning("Supabase warm-up skipped: %s", e)
+
+def close_supabase() -> None:
+    global _client, _http_client
+    with _client_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _client = None
+        _http_client = None
@@ -0,0 +1,438 @@
+"""
+Scaling benchmark for the analytics services on synthetic data.
+
+For each size (attendance rows) it generates deterministic members, events and
+event_attendance data, loads it into a dedicated schema ("<schema>_<size>") in
+DATABASE_URL with COPY, applies migrations/*.sql to that schema and ANALYZEs it.
+It then times the overview, retention and mission payloads for the unfiltered
+("all") window and every semester window, list_semester_options and the
+all-semester summary once, and captures EXPLAIN (ANALYZE, BUFFERS) for each
+statement a service runs.
+
+The report is JSON keyed by size, service and window, tagged with the git commit,
+so two commits can be compared with --compare. Only the benchmark schemas are
+dropped and recreated; public tables are never touched.
+
+Usage (from apps/server):
+    python -m benchmarks.analytics_services [--sizes 10000 100000 1000000] [--repeat 5]
+    python -m benchmarks.analytics_services --reuse --compare benchmarks/reports/<base>.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import platform
+import random
+import re
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+from app.db import get_conn
+from app.query_metrics import InstrumentedCursor
+from app.services.mission import build_mission_payload
+from app.services.overview import build_overview_payload
+from app.services.retention import build_retention_payload
+from app.services.semester import _bounds_for_term, _parse_semester_value, list_semester_options
+from app.services.semester_summary import build_semester_summary_payload
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+MIGRATIONS_DIR = SERVER_DIR / "migrations"
+REPORTS_DIR = SERVER_DIR / "benchmarks" / "reports"
+
+# Three academic years of events, so there are six semester windows
+DATA_START = datetime(2022, 8, 1, tzinfo=timezone.utc)
+DATA_DAYS = 3 * 365
+
+MEMBERS_PER_ATTENDANCE_ROW = 1 / 20
+ATTENDEES_PER_EVENT = 100
+GUEST_SHARE = 0.25
+COPY_BATCH_ROWS = 50_000
+
+# Services that cover every semester at once and take no window
+WINDOWLESS_SERVICES = {"semester_options", "semester_summary"}
+
+MAJOR_CATEGORIES = ["Technical", "Business", "Humanities & Arts", "Health Sciences", "Other/Unknown"]
+CLASS_YEARS = ["Freshman", "Sophomore", "Junior", "Senior", "Grad", None]
+
+SCHEMA_SQL = """
+DROP SCHEMA IF EXISTS {schema} CASCADE;
+CREATE SCHEMA {schema};
+
+CREATE TABLE {schema}.members (
+    email text PRIMARY KEY,
+    major_raw text,
+    major_normalized text,
+    major_category text,
+    degree_program text,
+    class_year text,
+    joined_at timestamptz,
+    is_active_member boolean NOT NULL DEFAULT FALSE,
+    active_member_start_date date
+);
+
+CREATE TABLE {schema}.events (
+    id uuid PRIMARY KEY,
+    title text,
+    starts_at timestamptz,
+    event_kind text,
+    event_type text,
+    location text,
+    committee text,
+    metadata jsonb,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE {schema}.event_attendance (
+    id bigserial PRIMARY KEY,
+    event_id uuid NOT NULL REFERENCES {schema}.events (id) ON DELETE CASCADE,
+    attendee_email text NOT NULL,
+    member_email text REFERENCES {schema}.members (email),
+    attendee_major_raw text,
+    attendee_major_normalized text,
+    attendee_major_category text,
+    attendee_program text,
+    check_in_at timestamptz,
+    metadata jsonb,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    UNIQUE (event_id, attendee_email)
+);
+"""
+
+
+def _size_label(size: int) -> str:
+    if size % 1_000_000 == 0:
+        return f"{size // 1_000_000}m"
+    if size % 1_000 == 0:
+        return f"{size // 1_000}k"
+    return str(size)
+
+
+def _copy(cur, table: str, columns: list[str], rows: list[tuple]) -> None:
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join("\\N" if value is None else str(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def _generate_and_load(conn, schema: str, size: int, seed: int) -> dict[str, int]:
+    rng = random.Random(seed)
+    n_members = max(100, int(size * MEMBERS_PER_ATTENDANCE_ROW))
+    n_events = max(10, size // ATTENDEES_PER_EVENT)
+    n_guests = int(n_members * GUEST_SHARE / (1 - GUEST_SHARE))
+
+    members = []
+    for i in range(n_members):
+        # Mixed case and padding like the imported roster, so the LOWER(TRIM()) joins do real work
+        email = f"Member{i}@sjsu.edu" if i % 7 else f" member{i}@SJSU.edu"
+        joined_at = DATA_START + timedelta(days=rng.randrange(DATA_DAYS))
+        active = rng.random() < 0.4
+        start_date = (joined_at + timedelta(days=rng.randrange(90))).date() if active else None
+        members.append(
+            (email, rng.choice(MAJOR_CATEGORIES), rng.choice(CLASS_YEARS), joined_at.isoformat(), active, start_date)
+        )
+
+    events = []
+    for i in range(n_events):
+        starts_at = DATA_START + timedelta(days=rng.randrange(DATA_DAYS), hours=rng.randrange(8, 21))
+        events.append((str(uuid.UUID(int=rng.getrandbits(128))), f"Synthetic event {i}", starts_at.isoformat()))
+
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_SQL.format(schema=schema))
+        _copy(
+            cur,
+            f"{schema}.members",
+            ["email", "major_category", "class_year", "joined_at", "is_active_member", "active_member_start_date"],
+            members,
+        )
+        _copy(cur, f"{schema}.events", ["id", "title", "starts_at"], events)
+
+        columns = ["event_id", "attendee_email", "member_email", "attendee_major_category"]
+        population = n_members + n_guests
+        batch: list[tuple] = []
+        attendance = 0
+        for index, event in enumerate(events):
+            # Spread the remaining rows over the remaining events so the total is exact
+            remaining_events = n_events - index
+            count = min(population, round((size - attendance) / remaining_events * rng.uniform(0.5, 1.5)))
+            if index == n_events - 1:
+                count = min(population, size - attendance)
+            for person in rng.sample(range(population), count):
+                if person < n_members:
+                    email, category = members[person][0], members[person][1]
+                    member_email = email if rng.random() < 0.8 else None
+                    batch.append((event[0], email.strip().lower(), member_email, category))
+                else:
+                    batch.append((event[0], f"guest{person}@gmail.com", None, rng.choice(MAJOR_CATEGORIES)))
+            attendance += count
+            if len(batch) >= COPY_BATCH_ROWS:
+                _copy(cur, f"{schema}.event_attendance", columns, batch)
+                batch = []
+        if batch:
+            _copy(cur, f"{schema}.event_attendance", columns, batch)
+
+        _apply_migrations(cur, schema)
+        cur.execute(f"COMMENT ON SCHEMA {schema} IS %s;", (_load_signature(seed),))
+    conn.commit()
+
+    # ANALYZE outside the load transaction so the planner sees the final row counts
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"ANALYZE {schema}.members, {schema}.events, {schema}.event_attendance, {schema}.event_stats;")
+    finally:
+        conn.autocommit = False
+    return {"members": n_members, "events": n_events, "event_attendance": attendance}
+
+
+def _apply_migrations(cur, schema: str) -> None:
+    """Runs migrations/*.sql with their public.* objects redirected to the benchmark schema."""
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        cur.execute(re.sub(r"\bpublic\.", f"{schema}.", path.read_text()))
+
+
+def _load_signature(seed: int) -> str:
+    """Identifies the data and schema a load produces: the seed and the migration files."""
+    digest = hashlib.sha1(str(seed).encode())
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _reusable_counts(conn, schema: str, signature: str) -> dict[str, int] | None:
+    """Row counts of a schema loaded with the same seed and migrations, else None."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT obj_description(oid, 'pg_namespace') AS signature FROM pg_namespace WHERE nspname = %s;",
+            (schema,),
+        )
+        row = cur.fetchone()
+        if row is None or row["signature"] != signature:
+            return None
+        counts = {}
+        for table in ("members", "events", "event_attendance"):
+            cur.execute(f"SELECT COUNT(*)::int AS n FROM {schema}.{table};")
+            counts[table] = cur.fetchone()["n"]
+    return counts
+
+
+class RecordingCursor(InstrumentedCursor):
+    """Pool cursor that remembers every statement it runs, for EXPLAIN afterwards."""
+
+    statements: list[tuple[str, object]] = []
+
+    def execute(self, query, vars=None):
+        RecordingCursor.statements.append((query, vars))
+        return super().execute(query, vars)
+
+
+def _record_statements(conn, run) -> list[tuple[str, object]]:
+    RecordingCursor.statements = []
+    cursor_factory = conn.cursor_factory
+    conn.cursor_factory = RecordingCursor
+    try:
+        run()
+    finally:
+        conn.cursor_factory = cursor_factory
+    return RecordingCursor.statements
+
+
+def _explain(conn, query: str, params) -> dict:
+    with conn.cursor() as cur:
+        explain_sql = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query.strip().rstrip(';')}"
+        if params:
+            cur.execute(explain_sql, params)
+        else:
+            cur.execute(explain_sql)
+        plan = cur.fetchone()["QUERY PLAN"]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    plan = plan[0]
+    top = plan["Plan"]
+    return {
+        "sql": query.strip(),
+        "execution_ms": round(plan["Execution Time"], 3),
+        "planning_ms": round(plan["Planning Time"], 3),
+        "shared_hit_blocks": top.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": top.get("Shared Read Blocks", 0),
+        "temp_written_blocks": top.get("Temp Written Blocks", 0),
+        "plan": plan,
+    }
+
+
+def _services(schema: str) -> dict:
+    tables = {
+        "members_table": f"{schema}.members",
+        "events_table": f"{schema}.events",
+        "attendance_table": f"{schema}.event_attendance",
+    }
+    return {
+        "semester_options": lambda conn, start, end: list_semester_options(conn, events_table=tables["events_table"]),
+        "semester_summary": lambda conn, start, end: build_semester_summary_payload(conn, **tables),
+        "overview": lambda conn, start, end: build_overview_payload(
+            conn,
+            members_table=tables["members_table"],
+            attendance_table=tables["attendance_table"],
+            semester_start=start,
+            semester_end=end,
+        ),
+        "retention": lambda conn, start, end: build_retention_payload(
+            conn, **tables, semester_start=start, semester_end=end
+        ),
+        "mission": lambda conn, start, end: build_mission_payload(
+            conn, **tables, event_stats_table=f"{schema}.event_stats", semester_start=start, semester_end=end
+        ),
+    }
+
+
+def _windows(conn, schema: str, limit: int | None) -> list[tuple[str, date | None, date | None]]:
+    windows: list[tuple[str, date | None, date | None]] = [("all", None, None)]
+    options = list_semester_options(conn, events_table=f"{schema}.events")[1:]
+    for option in options[:limit]:
+        start, end = _bounds_for_term(*_parse_semester_value(option["value"]))
+        windows.append((option["value"], start, end))
+    return windows
+
+
+def _benchmark_size(conn, schema: str, repeat: int, semesters: int | None, explain: bool) -> list[dict]:
+    results = []
+    services = _services(schema)
+    for window, start, end in _windows(conn, schema, semesters):
+        for service, run in services.items():
+            # Timed once, under the "all" window
+            if service in WINDOWLESS_SERVICES and window != "all":
+                continue
+            run(conn, start, end)  # warm the buffer cache
+            conn.rollback()
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                run(conn, start, end)
+                timings.append((time.perf_counter() - started) * 1000)
+                conn.rollback()
+
+            entry = {
+                "service": service,
+                "window": window,
+                "runs": repeat,
+                "median_ms": round(statistics.median(timings), 3),
+                "min_ms": round(min(timings), 3),
+                "max_ms": round(max(timings), 3),
+            }
+            if explain:
+                statements = _record_statements(conn, lambda: run(conn, start, end))
+                entry["queries"] = [_explain(conn, query, params) for query, params in statements]
+                conn.rollback()
+            results.append(entry)
+            print(f"  {service:<17} {window:<12} median {entry['median_ms']:>10.2f} ms")
+    return results
+
+
+def _git_commit() -> dict:
+    def git(*args: str) -> str | None:
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=SERVER_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def _compare(base_path: Path, report: dict) -> None:
+    base = json.loads(base_path.read_text())
+    base_commit = (base["git"]["commit"] or "unknown")[:10]
+    head_commit = (report["git"]["commit"] or "unknown")[:10]
+    print(f"\ncompare {base_commit} -> {head_commit} (median ms)")
+    print(f"{'size':>8} {'service':<17} {'window':<12} {'base':>10} {'head':>10} {'change':>8}")
+    for size, current in report["sizes"].items():
+        previous = {
+            (entry["service"], entry["window"]): entry
+            for entry in base["sizes"].get(size, {}).get("results", [])
+        }
+        for entry in current["results"]:
+            old = previous.get((entry["service"], entry["window"]))
+            if old is None:
+                continue
+            change = (entry["median_ms"] - old["median_ms"]) / old["median_ms"] * 100 if old["median_ms"] else 0.0
+            print(
+                f"{size:>8} {entry['service']:<17} {entry['window']:<12}"
+                f" {old['median_ms']:>10.2f} {entry['median_ms']:>10.2f} {change:>+7.1f}%"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="attendance rows")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per service and window")
+    parser.add_argument("--semesters", type=int, default=None, help="newest semester windows to time (default: all)")
+    parser.add_argument("--schema", default="analytics_bench", help="schema prefix for the synthetic data")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reuse", action="store_true", help="keep schemas already loaded with this size, seed and migrations")
+    parser.add_argument("--no-explain", action="store_true", help="skip EXPLAIN (ANALYZE, BUFFERS) capture")
+    parser.add_argument("--output", type=Path, default=None, help="report path (default: benchmarks/reports/)")
+    parser.add_argument("--compare", type=Path, default=None, help="earlier report to compare medians against")
+    args = parser.parse_args()
+
+    if not re.fullmatch(r"[a-z_][a-z0-9_]*", args.schema):
+        parser.error("--schema must be a lowercase SQL identifier")
+
+    report = {
+        "benchmark": "analytics_services",
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "git": _git_commit(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "sizes": {},
+    }
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SHOW server_version;")
+            report["postgres"] = cur.fetchone()["server_version"]
+        conn.rollback()
+
+        for size in args.sizes:
+            schema = f"{args.schema}_{_size_label(size)}"
+            counts = _reusable_counts(conn, schema, _load_signature(args.seed)) if args.reuse else None
+            conn.rollback()
+            if counts is None or counts["event_attendance"] != size:
+                print(f"loading {size} attendance rows into {schema}")
+                started = time.perf_counter()
+                counts = _generate_and_load(conn, schema, size, args.seed)
+                print(f"  loaded in {time.perf_counter() - started:.1f} s: {counts}")
+            else:
+                print(f"reusing {schema}: {counts}")
+
+            report["sizes"][str(size)] = {
+                "schema": schema,
+                "rows": counts,
+                "results": _benchmark_size(conn, schema, args.repeat, args.semesters, not args.no_explain),
+            }
+
+    output = args.output
+    if output is None:
+        commit = (report["git"]["commit"] or "nogit")[:10]
+        output = REPORTS_DIR / f"analytics_services-{commit}-{datetime.now():%Y%m%d%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+    print(f"report written to {output}")
+
+    if args.compare is not None:
+        _compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
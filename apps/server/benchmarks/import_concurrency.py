@@ -0,0 +1,107 @@
+"""
+Benchmark for request latency while an attendance import is running.
+
+Posts a synthetic attendance CSV to /api/import/event-attendance and, while it is
+in flight, polls /health and an analytics route on the same event loop. Latency
+percentiles are reported for an idle baseline and during the import; with the
+import pipeline off the event loop the two should stay close.
+
+Runs the ASGI app in-process against DATABASE_URL and the configured Supabase
+project, and leaves the imported synthetic event behind.
+
+Usage (from apps/server):
+    python -m benchmarks.import_concurrency [--rows 20000] [--path /analytics/semesters]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from app.main import app
+
+
+def build_csv(rows: int) -> bytes:
+    lines = ["Timestamp,Email Address,Major,What year are you?"]
+    for i in range(rows):
+        lines.append(f"11/21/2025 17:{i // 60 % 60:02d}:{i % 60:02d},bench.user{i}@sjsu.edu,B.S. Computer Science,Junior")
+    return "\n".join(lines).encode()
+
+
+async def _poll(client: httpx.AsyncClient, path: str, headers: dict, stop: asyncio.Event) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+def _report(label: str, latencies: list[float]) -> None:
+    if not latencies:
+        print(f"{label:<24} no samples")
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{label:<24} n={len(ordered):<5} p50={statistics.median(ordered):7.1f} ms"
+        f"  p95={p95:7.1f} ms  max={ordered[-1]:7.1f} ms"
+    )
+
+
+async def run(rows: int, path: str, baseline_seconds: float) -> None:
+    headers = {"Authorization": f"Bearer {os.environ['INTERNAL_API_SECRET']}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for label, route in (("health", "/health"), ("analytics", path)):
+            stop = asyncio.Event()
+            poller = asyncio.create_task(_poll(client, route, headers, stop))
+            await asyncio.sleep(baseline_seconds)
+            stop.set()
+            _report(f"{label} idle", await poller)
+
+        stop = asyncio.Event()
+        pollers = [
+            asyncio.create_task(_poll(client, "/health", headers, stop)),
+            asyncio.create_task(_poll(client, path, headers, stop)),
+        ]
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/import/event-attendance",
+            headers=headers,
+            data={
+                "import_type": "event_attendance",
+                "title": "Import concurrency benchmark",
+                "starts_at": "2025-11-21T17:00",
+                "event_kind": "nonsocial",
+            },
+            files={"file": ("bench.csv", build_csv(rows), "text/csv")},
+        )
+        import_seconds = time.perf_counter() - started
+        stop.set()
+        health, analytics = await asyncio.gather(*pollers)
+
+        response.raise_for_status()
+        print(f"import of {rows} rows took {import_seconds:.2f}s")
+        _report("health during import", health)
+        _report("analytics during import", analytics)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--path", default="/analytics/semesters", help="analytics route to poll")
+    parser.add_argument("--baseline-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.path, args.baseline_seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Micro-benchmark and golden-output check for major normalization on import.
+
+Builds a deterministic corpus of form-style major strings (degree prefixes,
+minors, double majors, casing and punctuation variants), then:
+
+  * --check compares normalize_major_and_category against the recorded outputs
+    in major_normalization_golden.json and exits non-zero on any difference;
+  * the default run times the uncached normalizer and the memoized one over an
+    import-shaped workload where the corpus repeats across many rows.
+
+--write-golden regenerates the golden file from the current implementation; only
+use it when a category change is intended.
+
+Usage (from apps/server):
+    python -m benchmarks.major_normalization [--check] [--rows 50000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+from app.api.import_event_info import normalize_major_and_category
+
+GOLDEN_PATH = Path(__file__).with_name("major_normalization_golden.json")
+
+BASE_MAJORS = [
+    # Alias keys and the special cases ahead of them
+    "computer science", "comp sci", "cs", "bscs", "software engineering", "software eng",
+    "swe", "se", "data science", "data sci", "ds", "artificial intelligence", "ai",
+    "computer engineering", "informatics", "information science and data analytics",
+    "information science", "data analytics", "business administration", "business",
+    "communication studies", "communications", "public relations", "marketing",
+    "finance", "economics", "econ", "accounting", "accountancy",
+    "management information systems", "mis", "business analytics", "ux", "ui ux",
+    "ui/ux", "interaction design", "graphic design", "animation", "illustration",
+    "interior design", "industrial design", "studio art", "art history", "photography",
+    "english", "history", "philosophy", "linguistics", "humanities", "religious studies",
+    "journalism", "radio television film", "sociology", "justice studies", "criminology",
+    "anthropology", "political science", "global studies", "chicana and chicano studies",
+    "african american studies", "american studies", "interdisciplinary studies",
+    "nursing", "public health", "kinesiology", "occupational therapy",
+    "speech language pathology", "nutritional science", "nutrition",
+    "clinical mental health counseling", "counseling", "psychology", "psych",
+    "biology", "bio", "biological sciences", "molecular biology",
+    # Keyword fallbacks
+    "mechanical engineering", "electrical engineering", "aerospace engineering",
+    "statistics", "applied mathematics", "math", "physics", "chemistry", "geology",
+    "meteorology", "climate science", "earth system science", "forensic science",
+    "taxation", "public administration", "transportation management",
+    "hospitality management", "health science", "recreation therapy", "music",
+    "dance", "theatre arts", "film", "spanish language", "world languages",
+    # Nothing matches / explicit unknowns
+    "undeclared", "undecided", "n/a", "na", "none", "unknown", "blank", "",
+    "liberal studies", "aviation", "child and adolescent development",
+]
+
+PREFIXES = ["", "B.S. ", "BS in ", "B.A. ", "M.S. ", "MS ", "MBA ", "Bachelor of ", "Masters in ", "PhD "]
+SUFFIXES = [
+    "",
+    " (minor in Business)",
+    ", minor in Art",
+    " / Math",
+    " + Philosophy",
+    " and Economics",
+    " concentration in Systems",
+    " BS",
+    " • Class of 2027",
+    ".",
+]
+
+
+def build_corpus() -> list[str]:
+    corpus = []
+    seen = set()
+    for base in BASE_MAJORS:
+        for i, prefix in enumerate(PREFIXES):
+            suffix = SUFFIXES[(i + len(base)) % len(SUFFIXES)]
+            for raw in (prefix + base + suffix, (prefix + base).upper(), f"  {base.title()}  "):
+                if raw not in seen:
+                    seen.add(raw)
+                    corpus.append(raw)
+    return corpus
+
+
+def _uncached(raw: str):
+    # lru_cache exposes the undecorated function as __wrapped__
+    return getattr(normalize_major_and_category, "__wrapped__", normalize_major_and_category)(raw)
+
+
+def check_golden(corpus: list[str]) -> int:
+    golden = json.loads(GOLDEN_PATH.read_text())
+    mismatches = []
+    for raw in corpus:
+        expected = golden.get(raw)
+        actual = list(normalize_major_and_category(raw))
+        if expected != actual:
+            mismatches.append((raw, expected, actual))
+    for raw, expected, actual in mismatches[:20]:
+        print(f"MISMATCH {raw!r}: expected {expected}, got {actual}")
+    print(f"{len(corpus) - len(mismatches)}/{len(corpus)} inputs match {GOLDEN_PATH.name}")
+    return 1 if mismatches else 0
+
+
+def write_golden(corpus: list[str]) -> None:
+    golden = {raw: list(_uncached(raw)) for raw in corpus}
+    # One entry per line keeps golden diffs readable
+    lines = [f"{json.dumps(raw, ensure_ascii=False)}: {json.dumps(out)}" for raw, out in golden.items()]
+    GOLDEN_PATH.write_text("{\n" + ",\n".join(lines) + "\n}\n")
+    print(f"Wrote {len(golden)} entries to {GOLDEN_PATH.name}")
+
+
+def _time(label: str, fn, workload: list[str]) -> None:
+    started = time.perf_counter()
+    for raw in workload:
+        fn(raw)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<10} {len(workload):>8} rows  {elapsed * 1000:9.1f} ms  {elapsed / len(workload) * 1e6:7.2f} us/row")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="compare outputs against the golden file")
+    parser.add_argument("--write-golden", action="store_true", help="regenerate the golden file")
+    parser.add_argument("--rows", type=int, default=50_000, help="rows in the timed workload")
+    args = parser.parse_args()
+
+    corpus = build_corpus()
+    if args.write_golden:
+        write_golden(corpus)
+        return
+    if args.check:
+        sys.exit(check_golden(corpus))
+
+    # Imports repeat a few hundred distinct strings across many rows
+    workload = random.Random(0).choices(corpus, k=args.rows)
+    print(f"{len(corpus)} distinct inputs")
+    _time("uncached", _uncached, workload)
+    cache_clear = getattr(normalize_major_and_category, "cache_clear", None)
+    if cache_clear is not None:
+        cache_clear()
+        _time("memoized", normalize_major_and_category, workload)
+
+
+if __name__ == "__main__":
+    main()
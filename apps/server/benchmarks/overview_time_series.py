@@ -0,0 +1,111 @@
+"""
+Benchmark for the members-over-time series in the overview payload.
+
+Compares the previous correlated-subquery plan with the current window-function
+plan over windows of increasing length, using EXPLAIN (ANALYZE, BUFFERS) against
+DATABASE_URL. For each query it reports how many times the members table was
+scanned (sum of actual loops on members scan nodes) and the execution time.
+
+Usage (from apps/server):
+    python -m benchmarks.overview_time_series [--months 6 24 60 120]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import date
+
+from app.db import get_conn
+from app.services.overview import build_overview_queries
+
+# Time-series query as it was before the window-function rewrite (filtered branch)
+LEGACY_TIME_SERIES_SQL = """
+SELECT
+    TO_CHAR(date_series, 'YYYY-MM') AS period,
+    (
+        SELECT COUNT(*)::int
+        FROM {members_table}
+        WHERE joined_at >= %(semester_start)s
+          AND joined_at < %(semester_end)s
+          AND joined_at < (date_series + INTERVAL '1 month')
+    ) AS registered_members_cumulative,
+    (
+        SELECT COUNT(*)::int
+        FROM {members_table}
+        WHERE is_active_member = TRUE
+          AND active_member_start_date IS NOT NULL
+          AND active_member_start_date >= %(semester_start)s
+          AND active_member_start_date < %(semester_end)s
+          AND active_member_start_date < (date_series + INTERVAL '1 month')
+    ) AS active_members_cumulative
+FROM generate_series(
+    DATE_TRUNC('month', %(semester_start)s::date),
+    DATE_TRUNC('month', (%(semester_end)s::date - INTERVAL '1 day')),
+    INTERVAL '1 month'
+) AS date_series
+ORDER BY date_series
+"""
+
+
+def _members_scan_loops(plan: dict, relation: str) -> int:
+    loops = 0
+    if plan.get("Relation Name") == relation:
+        loops += int(plan.get("Actual Loops", 0))
+    for child in plan.get("Plans", []):
+        loops += _members_scan_loops(child, relation)
+    return loops
+
+
+def _explain(cur, sql: str, params: dict) -> dict:
+    cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+    row = cur.fetchone()
+    plan = row["QUERY PLAN"]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def _window_ending(end: date, months: int) -> tuple[date, date]:
+    total = end.year * 12 + (end.month - 1) - months
+    return date(total // 12, total % 12 + 1, 1), end
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--months", type=int, nargs="+", default=[6, 24, 60, 120])
+    parser.add_argument("--members-table", default="public.members")
+    args = parser.parse_args()
+
+    relation = args.members_table.split(".")[-1]
+    _, current_sql, _ = build_overview_queries(
+        members_table=args.members_table,
+        is_filtered=True,
+    )
+    legacy_sql = LEGACY_TIME_SERIES_SQL.format(members_table=args.members_table)
+    today = date.today().replace(day=1)
+
+    results = []
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for months in args.months:
+                semester_start, semester_end = _window_ending(today, months)
+                params = {"semester_start": semester_start, "semester_end": semester_end}
+                for name, sql in (("legacy", legacy_sql), ("window", current_sql)):
+                    explained = _explain(cur, sql, params)
+                    results.append(
+                        {
+                            "query": name,
+                            "months": months,
+                            "members_scans": _members_scan_loops(explained["Plan"], relation),
+                            "execution_ms": round(explained["Execution Time"], 3),
+                        }
+                    )
+
+    print(f"{'query':<8} {'months':>6} {'members scans':>14} {'exec ms':>10}")
+    for r in results:
+        print(f"{r['query']:<8} {r['months']:>6} {r['members_scans']:>14} {r['execution_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark for analytics response formats.
+
+Builds each analytics payload once per semester window against DATABASE_URL,
+then serializes it in the "rows" and "columnar" formats and reports the body
+size and the median serialization time of each.
+
+Usage (from apps/server):
+    python -m benchmarks.payload_formats [--repeat 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+from datetime import date
+
+from app.db import get_conn
+from app.services.dashboard import build_dashboard_payload
+from app.services.mission import build_mission_payload
+from app.services.overview import build_overview_payload
+from app.services.payload_format import encode_payload
+from app.services.retention import build_retention_payload
+from app.services.semester import get_semester_options, resolve_semester_window
+
+BUILDERS = {
+    "overview": build_overview_payload,
+    "retention": build_retention_payload,
+    "mission": build_mission_payload,
+    "dashboard": build_dashboard_payload,
+}
+
+
+def _windows(conn) -> list[tuple[str, date | None, date | None]]:
+    options, _ = get_semester_options(conn)
+    windows = []
+    for option in options[:3]:
+        value = None if option["value"] == "all" else option["value"]
+        start, end, _ = resolve_semester_window(conn, value)
+        windows.append((option["value"], start, end))
+    return windows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="serializations timed per format")
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<10} {'semester':<12} {'rows B':>8} {'col B':>8} {'rows ms':>8} {'col ms':>8}")
+    with get_conn() as conn:
+        for label, start, end in _windows(conn):
+            for endpoint, build in BUILDERS.items():
+                payload = build(conn, semester_start=start, semester_end=end)
+                results = {}
+                for payload_format in ("rows", "columnar"):
+                    timings = []
+                    for _ in range(args.repeat):
+                        body, seconds = encode_payload(endpoint, payload, payload_format)
+                        timings.append(seconds)
+                    results[payload_format] = (len(body), statistics.median(timings) * 1000)
+                print(
+                    f"{endpoint:<10} {label:<12} {results['rows'][0]:>8} {results['columnar'][0]:>8}"
+                    f" {results['rows'][1]:>8.3f} {results['columnar'][1]:>8.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
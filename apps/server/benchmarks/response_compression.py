@@ -0,0 +1,110 @@
+"""
+Benchmark for response compression and time-to-first-byte.
+
+Starts the app under uvicorn on a local port and requests the combined
+/analytics/ payload (and, with --import-rows, an attendance import) with
+Accept-Encoding identity, gzip and br. For each it reports the bytes on the wire,
+the time to the first body byte and the total time.
+
+Runs against DATABASE_URL and the configured Supabase project; an import run
+leaves its synthetic event behind.
+
+Usage (from apps/server):
+    python -m benchmarks.response_compression [--path /analytics/] [--import-rows 0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from app.main import app
+
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def _start_server() -> tuple[uvicorn.Server, str]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def _measure(client: httpx.Client, method: str, url: str, **kwargs) -> tuple[int, float, float, str]:
+    """Returns (wire bytes, seconds to first body byte, total seconds, content-encoding)."""
+    started = time.perf_counter()
+    first_byte = None
+    wire_bytes = 0
+    with client.stream(method, url, **kwargs) as response:
+        response.raise_for_status()
+        for chunk in response.iter_raw():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            wire_bytes += len(chunk)
+        encoding = response.headers.get("content-encoding", "identity")
+    return wire_bytes, first_byte or 0.0, time.perf_counter() - started, encoding
+
+
+def _report(label: str, samples: list[tuple[int, float, float, str]]) -> None:
+    wire_bytes, _, _, encoding = samples[-1]
+    ttfb = statistics.median(s[1] for s in samples) * 1000
+    total = statistics.median(s[2] for s in samples) * 1000
+    print(f"{label:<28} {encoding:<9} {wire_bytes:>9} B  ttfb {ttfb:8.1f} ms  total {total:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/analytics/")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--import-rows", type=int, default=0, help="also time an import of this many rows")
+    args = parser.parse_args()
+
+    server, base_url = _start_server()
+    headers = {"Authorization": f"Bearer {os.environ['INTERNAL_API_SECRET']}"}
+    try:
+        with httpx.Client(base_url=base_url, headers=headers, timeout=None) as client:
+            for encoding in ENCODINGS:
+                samples = [
+                    _measure(client, "GET", args.path, headers={"Accept-Encoding": encoding})
+                    for _ in range(args.repeat)
+                ]
+                _report(f"GET {args.path}", samples)
+
+            if args.import_rows:
+                lines = ["Email Address,Major"] + [
+                    f"bench.user{i}@sjsu.edu,B.S. Computer Science" for i in range(args.import_rows)
+                ]
+                # Every other row repeats an email so the response carries skipped rows
+                body = "\n".join(lines + lines[1:]).encode()
+                for encoding in ENCODINGS:
+                    sample = _measure(
+                        client,
+                        "POST",
+                        "/api/import/event-attendance",
+                        headers={"Accept-Encoding": encoding},
+                        data={
+                            "import_type": "event_attendance",
+                            "title": "Response compression benchmark",
+                            "starts_at": "2025-11-21T17:00",
+                            "event_kind": "nonsocial",
+                        },
+                        files={"file": ("bench.csv", body, "text/csv")},
+                    )
+                    _report(f"POST import ({args.import_rows} rows)", [sample])
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
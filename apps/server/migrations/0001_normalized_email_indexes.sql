@@ -0,0 +1,15 @@
+-- Indexes backing the semester-scoped mission demographics query.
+--
+-- build_mission_queries() normalizes each semester attendee email once and joins
+-- members on LOWER(TRIM(email)); the expression index lets that join probe members
+-- instead of scanning them, and the attendance/event indexes keep the semester
+-- attendee set limited to the window's events.
+
+CREATE INDEX IF NOT EXISTS members_email_normalized_idx
+    ON public.members (LOWER(TRIM(email)));
+
+CREATE INDEX IF NOT EXISTS events_starts_at_idx
+    ON public.events (starts_at);
+
+CREATE INDEX IF NOT EXISTS event_attendance_event_id_idx
+    ON public.event_attendance (event_id);
@@ -0,0 +1,94 @@
+-- Per-member attendance rollup maintained on import.
+--
+-- One row per (normalized attendee email, semester) with the number of distinct
+-- events attended and the attendee-reported major category. Retention analytics can
+-- read its buckets from here instead of recounting event_attendance per request.
+-- Events outside both terms are rolled up under semester_key = 'none' so the
+-- unfiltered ("all") view still sees them.
+
+-- Mirrors _term_for_date() in app/services/semester.py; keep the two in sync.
+CREATE OR REPLACE FUNCTION public.semester_key_for_date(d date)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN d >= make_date(EXTRACT(YEAR FROM d)::int, 1, 15)
+         AND d < make_date(EXTRACT(YEAR FROM d)::int, 5, 16)
+            THEN EXTRACT(YEAR FROM d)::int || '-spring'
+        WHEN d >= make_date(EXTRACT(YEAR FROM d)::int, 8, 20)
+         AND d < make_date(EXTRACT(YEAR FROM d)::int, 12, 25)
+            THEN EXTRACT(YEAR FROM d)::int || '-fall'
+    END
+$$;
+
+CREATE TABLE IF NOT EXISTS public.member_attendance_rollup (
+    email text NOT NULL,
+    semester_key text NOT NULL,
+    events_attended integer NOT NULL,
+    attendee_major_category text NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (email, semester_key)
+);
+
+CREATE INDEX IF NOT EXISTS member_attendance_rollup_semester_key_idx
+    ON public.member_attendance_rollup (semester_key);
+
+-- Lets the incremental refresh find an upload's emails without scanning attendance
+CREATE INDEX IF NOT EXISTS event_attendance_attendee_email_normalized_idx
+    ON public.event_attendance (LOWER(TRIM(attendee_email)));
+
+-- Recomputes every semester row for the given normalized emails.
+-- Called by the attendance import with the emails from the uploaded CSV.
+CREATE OR REPLACE FUNCTION public.refresh_member_attendance_rollup(emails text[])
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    affected integer;
+BEGIN
+    DELETE FROM public.member_attendance_rollup
+    WHERE email = ANY(emails);
+
+    INSERT INTO public.member_attendance_rollup (email, semester_key, events_attended, attendee_major_category)
+    SELECT
+        LOWER(TRIM(a.attendee_email)) AS email,
+        COALESCE(public.semester_key_for_date(DATE(e.starts_at)), 'none') AS semester_key,
+        COUNT(DISTINCT a.event_id)::int AS events_attended,
+        MAX(COALESCE(NULLIF(TRIM(a.attendee_major_category), ''), 'Unknown')) AS attendee_major_category
+    FROM public.event_attendance a
+    JOIN public.events e ON e.id = a.event_id
+    WHERE LOWER(TRIM(a.attendee_email)) = ANY(emails)
+    GROUP BY 1, 2;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END
+$$;
+
+-- Full rebuild for backfills: python -m app.commands.rebuild_attendance_rollup
+CREATE OR REPLACE FUNCTION public.rebuild_member_attendance_rollup()
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    affected integer;
+BEGIN
+    DELETE FROM public.member_attendance_rollup;
+
+    INSERT INTO public.member_attendance_rollup (email, semester_key, events_attended, attendee_major_category)
+    SELECT
+        LOWER(TRIM(a.attendee_email)) AS email,
+        COALESCE(public.semester_key_for_date(DATE(e.starts_at)), 'none') AS semester_key,
+        COUNT(DISTINCT a.event_id)::int AS events_attended,
+        MAX(COALESCE(NULLIF(TRIM(a.attendee_major_category), ''), 'Unknown')) AS attendee_major_category
+    FROM public.event_attendance a
+    JOIN public.events e ON e.id = a.event_id
+    WHERE a.attendee_email IS NOT NULL
+      AND TRIM(a.attendee_email) <> ''
+    GROUP BY 1, 2;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END
+$$;
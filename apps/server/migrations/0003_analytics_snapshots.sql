@@ -0,0 +1,18 @@
+-- Precomputed analytics payloads for the read-heavy dashboard.
+--
+-- One row per (endpoint, semester_key) where semester_key is 'YYYY-term' or 'all'.
+-- Rows are rewritten in a single transaction after each import, so readers keep
+-- seeing the previous snapshot until the refresh commits. payload is json rather
+-- than jsonb to keep the payload's key order.
+
+CREATE TABLE IF NOT EXISTS public.analytics_snapshots (
+    endpoint text NOT NULL,
+    semester_key text NOT NULL,
+    payload json NOT NULL,
+    refreshed_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (endpoint, semester_key)
+);
+
+-- Snapshot freshness is checked against the newest imported event
+CREATE INDEX IF NOT EXISTS events_created_at_idx
+    ON public.events (created_at);
@@ -0,0 +1,105 @@
+-- Stored normalized emails and indexes for the analytics hot predicates.
+--
+-- Generated columns hold each email normalized once per row, so the services
+-- filter, join and group on plain indexed columns (and can use index-only scans)
+-- instead of re-evaluating an expression. The normalization matches the importer's
+-- normalize_email(): lowercase with all whitespace removed, so the member lookup and
+-- the emails the importer stores agree on every value. Adding a stored generated
+-- column rewrites the table under an ACCESS EXCLUSIVE lock; run this outside peak
+-- hours on large tables.
+
+ALTER TABLE public.members
+    ADD COLUMN IF NOT EXISTS email_normalized text
+        GENERATED ALWAYS AS (LOWER(regexp_replace(email, '\s+', '', 'g'))) STORED;
+
+ALTER TABLE public.event_attendance
+    ADD COLUMN IF NOT EXISTS attendee_email_normalized text
+        GENERATED ALWAYS AS (LOWER(regexp_replace(attendee_email, '\s+', '', 'g'))) STORED,
+    ADD COLUMN IF NOT EXISTS member_email_normalized text
+        GENERATED ALWAYS AS (LOWER(regexp_replace(member_email, '\s+', '', 'g'))) STORED;
+
+-- Member lookups by normalized email (imports, mission demographics, retention)
+CREATE INDEX IF NOT EXISTS members_email_normalized_col_idx
+    ON public.members (email_normalized);
+
+-- Per-person attendance counts: GROUP BY email, COUNT(DISTINCT event_id) from the index alone
+CREATE INDEX IF NOT EXISTS event_attendance_attendee_email_normalized_event_id_idx
+    ON public.event_attendance (attendee_email_normalized, event_id);
+
+-- Attendance of one event and per-event distinct attendees. The name matches the
+-- default name of the UNIQUE (event_id, attendee_email) constraint the import's
+-- ON CONFLICT relies on, so databases that already have it are left unchanged.
+CREATE UNIQUE INDEX IF NOT EXISTS event_attendance_event_id_attendee_email_key
+    ON public.event_attendance (event_id, attendee_email);
+
+-- Covered by the (event_id, attendee_email) index above
+DROP INDEX IF EXISTS public.event_attendance_event_id_idx;
+
+-- Registration windows in the overview KPIs and time series
+CREATE INDEX IF NOT EXISTS members_joined_at_idx
+    ON public.members (joined_at);
+
+-- Active members only: activation windows in the overview time series and the active count
+CREATE INDEX IF NOT EXISTS members_active_member_start_date_idx
+    ON public.members (active_member_start_date)
+    WHERE is_active_member = TRUE;
+
+-- The rollup refresh matches an upload's emails on the stored column now, which
+-- replaces the expression index from migrations/0002.
+CREATE OR REPLACE FUNCTION public.refresh_member_attendance_rollup(emails text[])
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    affected integer;
+BEGIN
+    DELETE FROM public.member_attendance_rollup
+    WHERE email = ANY(emails);
+
+    INSERT INTO public.member_attendance_rollup (email, semester_key, events_attended, attendee_major_category)
+    SELECT
+        a.attendee_email_normalized AS email,
+        COALESCE(public.semester_key_for_date(DATE(e.starts_at)), 'none') AS semester_key,
+        COUNT(DISTINCT a.event_id)::int AS events_attended,
+        MAX(COALESCE(NULLIF(TRIM(a.attendee_major_category), ''), 'Unknown')) AS attendee_major_category
+    FROM public.event_attendance a
+    JOIN public.events e ON e.id = a.event_id
+    WHERE a.attendee_email_normalized = ANY(emails)
+    GROUP BY 1, 2;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END
+$$;
+
+-- The full rebuild keys the rollup by the same stored column
+CREATE OR REPLACE FUNCTION public.rebuild_member_attendance_rollup()
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    affected integer;
+BEGIN
+    DELETE FROM public.member_attendance_rollup;
+
+    INSERT INTO public.member_attendance_rollup (email, semester_key, events_attended, attendee_major_category)
+    SELECT
+        a.attendee_email_normalized AS email,
+        COALESCE(public.semester_key_for_date(DATE(e.starts_at)), 'none') AS semester_key,
+        COUNT(DISTINCT a.event_id)::int AS events_attended,
+        MAX(COALESCE(NULLIF(TRIM(a.attendee_major_category), ''), 'Unknown')) AS attendee_major_category
+    FROM public.event_attendance a
+    JOIN public.events e ON e.id = a.event_id
+    WHERE a.attendee_email_normalized IS NOT NULL
+      AND a.attendee_email_normalized <> ''
+    GROUP BY 1, 2;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END
+$$;
+
+DROP INDEX IF EXISTS public.event_attendance_attendee_email_normalized_idx;
+
+-- members_email_normalized_idx (migrations/0001) stays: Supabase functions outside
+-- this repository may still match members on the LOWER(TRIM(email)) expression.
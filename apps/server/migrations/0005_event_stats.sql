@@ -0,0 +1,120 @@
+-- Per-event attendance statistics maintained on import.
+--
+-- One row per event with attendance: its distinct attendee count and those
+-- attendees broken down by major category ({"Technical": 42, ...}). The mission
+-- event diversity chart reads its top N events from here with an indexed
+-- ORDER BY total_attendees DESC LIMIT N instead of counting every event's
+-- attendance per request. Major categories resolve like the chart always has: the
+-- member's category, else the attendee-reported one, with 'Unknown/other' and
+-- blanks reported as 'Other/Unknown'.
+
+CREATE TABLE IF NOT EXISTS public.event_stats (
+    event_id uuid PRIMARY KEY REFERENCES public.events (id) ON DELETE CASCADE,
+    total_attendees integer NOT NULL,
+    major_category_counts jsonb NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Top-N read for the unfiltered window; event_id keeps ties in a stable order
+CREATE INDEX IF NOT EXISTS event_stats_total_attendees_idx
+    ON public.event_stats (total_attendees DESC, event_id);
+
+-- Recomputes the rows for the given events.
+-- Called by the attendance import, in its transaction, with the imported event.
+CREATE OR REPLACE FUNCTION public.refresh_event_stats(event_ids uuid[])
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    affected integer;
+BEGIN
+    DELETE FROM public.event_stats
+    WHERE event_id = ANY(event_ids);
+
+    INSERT INTO public.event_stats (event_id, total_attendees, major_category_counts)
+    SELECT
+        per_major.event_id,
+        totals.total_attendees,
+        jsonb_object_agg(per_major.major_category, per_major.attendees)
+    FROM (
+        SELECT
+            a.event_id,
+            COALESCE(
+              NULLIF(
+                CASE
+                    WHEN COALESCE(m.major_category, a.attendee_major_category) = 'Unknown/other' THEN 'Other/Unknown'
+                    ELSE COALESCE(m.major_category, a.attendee_major_category)
+                END,
+                ''
+              ),
+              'Other/Unknown'
+            ) AS major_category,
+            COUNT(DISTINCT a.attendee_email)::int AS attendees
+        FROM public.event_attendance a
+        LEFT JOIN public.members m ON m.email_normalized = a.member_email_normalized
+        WHERE a.event_id = ANY(event_ids)
+        GROUP BY 1, 2
+    ) per_major
+    JOIN (
+        SELECT event_id, COUNT(DISTINCT attendee_email)::int AS total_attendees
+        FROM public.event_attendance
+        WHERE event_id = ANY(event_ids)
+        GROUP BY 1
+        HAVING COUNT(DISTINCT attendee_email) > 0
+    ) totals ON totals.event_id = per_major.event_id
+    GROUP BY per_major.event_id, totals.total_attendees;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END
+$$;
+
+-- Full rebuild for backfills and after member majors change:
+-- python -m app.commands.rebuild_event_stats
+CREATE OR REPLACE FUNCTION public.rebuild_event_stats()
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    affected integer;
+BEGIN
+    DELETE FROM public.event_stats;
+
+    INSERT INTO public.event_stats (event_id, total_attendees, major_category_counts)
+    SELECT
+        per_major.event_id,
+        totals.total_attendees,
+        jsonb_object_agg(per_major.major_category, per_major.attendees)
+    FROM (
+        SELECT
+            a.event_id,
+            COALESCE(
+              NULLIF(
+                CASE
+                    WHEN COALESCE(m.major_category, a.attendee_major_category) = 'Unknown/other' THEN 'Other/Unknown'
+                    ELSE COALESCE(m.major_category, a.attendee_major_category)
+                END,
+                ''
+              ),
+              'Other/Unknown'
+            ) AS major_category,
+            COUNT(DISTINCT a.attendee_email)::int AS attendees
+        FROM public.event_attendance a
+        LEFT JOIN public.members m ON m.email_normalized = a.member_email_normalized
+        GROUP BY 1, 2
+    ) per_major
+    JOIN (
+        SELECT event_id, COUNT(DISTINCT attendee_email)::int AS total_attendees
+        FROM public.event_attendance
+        GROUP BY 1
+        HAVING COUNT(DISTINCT attendee_email) > 0
+    ) totals ON totals.event_id = per_major.event_id
+    GROUP BY per_major.event_id, totals.total_attendees;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END
+$$;
+
+-- Backfill the events imported before this migration
+SELECT public.rebuild_event_stats();
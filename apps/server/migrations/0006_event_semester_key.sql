@@ -0,0 +1,18 @@
+-- Stored semester key on events.
+--
+-- events.semester_key holds the semester an event falls in ('2025-fall', or NULL
+-- between terms), as computed by semester_key_for_date() (migrations/0002), which
+-- also backfills existing rows here. Semester windows filter events by equality
+-- on this column, semester options are a DISTINCT over its index, and every
+-- semester can be aggregated in one GROUP BY semester_key. migrations/0008 keeps
+-- it in sync on insert and when starts_at changes.
+
+ALTER TABLE public.events
+    ADD COLUMN IF NOT EXISTS semester_key text;
+
+UPDATE public.events
+SET semester_key = public.semester_key_for_date(DATE(starts_at))
+WHERE semester_key IS DISTINCT FROM public.semester_key_for_date(DATE(starts_at));
+
+CREATE INDEX IF NOT EXISTS events_semester_key_idx
+    ON public.events (semester_key);
@@ -0,0 +1,10 @@
+-- Data version stamp on analytics snapshots.
+--
+-- analytics_snapshots.data_version holds the ETag of the data version
+-- (app/services/data_version.py) the payload was computed at. Snapshots are only
+-- served while it matches the current version, so member changes and new days
+-- invalidate them as well, not just newly imported events. Rows written before
+-- this migration have no stamp and are computed live until the next refresh.
+
+ALTER TABLE public.analytics_snapshots
+    ADD COLUMN IF NOT EXISTS data_version text;
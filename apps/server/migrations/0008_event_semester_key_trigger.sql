@@ -0,0 +1,27 @@
+-- Keep events.semester_key (migrations/0006) in sync with starts_at.
+--
+-- A BEFORE INSERT OR UPDATE OF starts_at trigger sets the key with
+-- semester_key_for_date(), so events inserted or rescheduled by any client (the
+-- importer, the Supabase dashboard, ad-hoc SQL) get the right semester without a
+-- manual UPDATE.
+
+CREATE OR REPLACE FUNCTION public.set_event_semester_key()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.semester_key := public.semester_key_for_date(DATE(NEW.starts_at));
+    RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS events_set_semester_key ON public.events;
+CREATE TRIGGER events_set_semester_key
+    BEFORE INSERT OR UPDATE OF starts_at ON public.events
+    FOR EACH ROW
+    EXECUTE FUNCTION public.set_event_semester_key();
+
+-- Fix any events written outside the importer since 0006
+UPDATE public.events
+SET semester_key = public.semester_key_for_date(DATE(starts_at))
+WHERE semester_key IS DISTINCT FROM public.semester_key_for_date(DATE(starts_at));